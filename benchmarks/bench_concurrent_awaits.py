@@ -0,0 +1,91 @@
+"""
+Wall-clock cost of the coin toss, defensive submission and offensive play, with their independent awaits run
+concurrently and, for comparison, run one after another.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_concurrent_awaits
+"""
+import asyncio
+import json
+import pathlib
+import time
+
+import fcfb.discord.commands as commands
+import fcfb.discord.game as game
+from fcfb.main.hypnotoad import compile_result_messages
+from benchmarks.fakes import CONFIG_DATA, GAME_ID, FakeChannel, FakeObject, install_fakes, \
+    make_game_object, reset_caches
+from fcfb.discord.context import MessageContext
+from fcfb.discord.game_store import game_store
+from fcfb.main.concurrency import gather_all, gather_or_cancel
+
+ZEBSTRIKA_LATENCY = 0.040
+DISCORD_LATENCY = 0.060
+ITERATIONS = 10
+
+MESSAGES_PATH = pathlib.Path(__file__).parent.parent / "fcfb" / "resources" / "messages.json"
+
+
+async def gather_in_sequence(*coroutines):
+    return [await coroutine for coroutine in coroutines]
+
+
+async def coin_toss(client, discord_messages, home_user, away_user):
+    game_object = make_game_object(coinTossWinner="None", coinTossChoice="None", waitingOn="away_coach")
+    message = FakeObject(content="heads", channel=client.thread, author=away_user, id=1)
+    context = MessageContext(CONFIG_DATA, message)
+    await commands.coin_toss_command(client, CONFIG_DATA, game_object, discord_messages, "heads", message, context)
+
+
+async def defensive_submission(client, discord_messages, home_user, away_user):
+    await game_store.record_dm_prompt(away_user.id, GAME_ID)
+    message = FakeObject(content="123", channel=FakeChannel(2, client.latency), author=away_user, id=2)
+    context = MessageContext(CONFIG_DATA, message)
+    await game.validate_and_submit_defensive_number(client, CONFIG_DATA, discord_messages, message, context)
+
+
+async def offensive_play(client, discord_messages, home_user, away_user):
+    await game_store.record_defensive_timeout(GAME_ID, False)
+    message = FakeObject(content="420 run", channel=client.thread, author=home_user, id=3)
+    context = MessageContext(CONFIG_DATA, message)
+    await game.validate_and_submit_offensive_number(client, CONFIG_DATA, discord_messages, message, context)
+
+
+FLOWS = {
+    "coin toss": (coin_toss, make_game_object(waitingOn="away_coach")),
+    "defensive submission": (defensive_submission, make_game_object(waitingOn="away_coach")),
+    "offensive play": (offensive_play, make_game_object(waitingOn="home_coach"))
+}
+
+
+async def time_flow(flow, game_object, discord_messages):
+    session, client, home_user, away_user = install_fakes(ZEBSTRIKA_LATENCY, DISCORD_LATENCY, game_object)
+    timings = []
+    for _ in range(ITERATIONS):
+        reset_caches()
+        start = time.perf_counter()
+        await flow(client, discord_messages, home_user, away_user)
+        timings.append(time.perf_counter() - start)
+    return sum(timings) / len(timings)
+
+
+async def main():
+    with open(MESSAGES_PATH, 'r') as discord_messages_file:
+        discord_messages = json.load(discord_messages_file)
+    discord_messages["resultMessageIndex"] = compile_result_messages(discord_messages, strict=False)
+
+    print(f"Zebstrika latency {ZEBSTRIKA_LATENCY * 1000:.0f} ms, Discord latency {DISCORD_LATENCY * 1000:.0f} ms, "
+          f"{ITERATIONS} iterations, cold caches")
+    print(f"{'flow':<22}{'sequential':>12}{'concurrent':>12}{'saved':>10}")
+    for name, (flow, game_object) in FLOWS.items():
+        commands.gather_all = game.gather_all = game.gather_or_cancel = gather_in_sequence
+        sequential = await time_flow(flow, game_object, discord_messages)
+        commands.gather_all, game.gather_all, game.gather_or_cancel = gather_all, gather_all, gather_or_cancel
+        concurrent = await time_flow(flow, game_object, discord_messages)
+        print(f"{name:<22}{sequential * 1000:>10.0f}ms{concurrent * 1000:>10.0f}ms"
+              f"{(sequential - concurrent) * 1000:>8.0f}ms")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
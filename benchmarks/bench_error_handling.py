@@ -0,0 +1,196 @@
+"""
+Per-call cost of async_exception_handler on the success path, and what one failure five calls deep costs, for the
+current decorator and for the previous one that logged at every level while each handler re-wrapped the error in
+Exception(e). The success path is also broken down into the bare wrapper, its latency timing, the histogram
+observation and the span it adds while a trace is open.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_error_handling
+"""
+import asyncio
+import functools
+import logging
+import time
+from time import perf_counter
+
+from fcfb.main.exceptions import async_exception_handler, log_event_error, DiscordAPIError, GameError, \
+    InvalidParameterError
+from fcfb.main.metrics import handler_seconds
+from fcfb.main.tracing import tracer
+
+CALLS = 200000
+FAILURES = 5000
+DEPTH = 5
+
+legacy_logger = logging.getLogger("benchmarks.legacy_exception_handler")
+
+
+class CountingHandler(logging.Handler):
+    """
+    Count and format records without writing them anywhere
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = 0
+
+    def emit(self, record):
+        self.records += 1
+        self.format(record)
+
+
+def legacy_exception_handler():
+    """
+    The decorator as it was before errors were logged once at the event boundary
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except DiscordAPIError as dae:
+                error_message = f"Discord API error in {func.__name__}(): {dae}"
+                legacy_logger.error(error_message)
+                raise dae
+            except InvalidParameterError as ipe:
+                error_message = f"Invalid parameter error in {func.__name__}(): {ipe}"
+                legacy_logger.error(error_message)
+                raise ipe
+            except GameError as ge:
+                error_message = f"Game error in {func.__name__}(): {ge}"
+                legacy_logger.error(error_message)
+                raise ge
+            except Exception as e:
+                error_message = f"An unexpected error occurred in {func.__name__}(): {e}"
+                legacy_logger.error(error_message)
+                raise e
+        return wrapper
+    return decorator
+
+
+def wrapper_only():
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_only():
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started_at = perf_counter()
+            result = await func(*args, **kwargs)
+            perf_counter() - started_at
+            return result
+        return wrapper
+    return decorator
+
+
+def observed_only():
+    def decorator(func):
+        latency = handler_seconds.labels("benchmarks", "observed_only")
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started_at = perf_counter()
+            result = await func(*args, **kwargs)
+            latency.observe(perf_counter() - started_at)
+            return result
+        return wrapper
+    return decorator
+
+
+async def succeed():
+    return 1
+
+
+async def fail():
+    raise GameError("It is not your turn to submit a number")
+
+
+def build_legacy_chain(leaf):
+    func = legacy_exception_handler()(leaf)
+    for _ in range(DEPTH - 1):
+        async def rewrap(inner=func):
+            try:
+                return await inner()
+            except Exception as e:
+                raise Exception(e)
+        func = legacy_exception_handler()(rewrap)
+    return func
+
+
+def build_current_chain(leaf):
+    func = async_exception_handler()(leaf)
+    for _ in range(DEPTH - 1):
+        async def passthrough(inner=func):
+            return await inner()
+        func = async_exception_handler()(passthrough)
+    return func
+
+
+async def time_calls(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        await func()
+    return (time.perf_counter() - start) / count
+
+
+async def time_failures(chain, boundary):
+    start = time.perf_counter()
+    error = None
+    for _ in range(FAILURES):
+        try:
+            await chain()
+        except Exception as e:
+            error = e
+            boundary(e)
+    return (time.perf_counter() - start) / FAILURES, error
+
+
+async def main():
+    counting_handler = CountingHandler()
+    logging.getLogger().addHandler(counting_handler)
+    logging.getLogger().setLevel(logging.INFO)
+
+    bare = await time_calls(succeed, CALLS)
+    legacy = await time_calls(legacy_exception_handler()(succeed), CALLS)
+    current = await time_calls(async_exception_handler()(succeed), CALLS)
+    print(f"success path, {CALLS} calls")
+    print(f"{'decorator':<12}{'per call':>12}{'overhead':>12}")
+    print(f"{'none':<12}{bare * 1e6:>9.2f} us")
+    print(f"{'legacy':<12}{legacy * 1e6:>9.2f} us{(legacy - bare) * 1e6:>9.2f} us")
+    print(f"{'current':<12}{current * 1e6:>9.2f} us{(current - bare) * 1e6:>9.2f} us")
+
+    # Each step adds one part of the current decorator's work on top of the one before it
+    steps = [("wrapper", await time_calls(wrapper_only()(succeed), CALLS)),
+             ("+ timing", await time_calls(timed_only()(succeed), CALLS)),
+             ("+ histogram", await time_calls(observed_only()(succeed), CALLS)),
+             ("no trace", current)]
+    async with tracer.trace("bench_error_handling"):
+        steps.append(("in a trace", await time_calls(async_exception_handler()(succeed), CALLS)))
+    print(f"\nsuccess path broken down, {CALLS} calls")
+    print(f"{'step':<12}{'per call':>12}{'added':>12}")
+    previous = bare
+    for name, per_call in steps:
+        print(f"{name:<12}{per_call * 1e6:>9.2f} us{(per_call - previous) * 1e6:>9.2f} us")
+        previous = per_call
+
+    print(f"\none failure {DEPTH} calls deep, {FAILURES} failures")
+    print(f"{'decorator':<12}{'per failure':>12}{'log records':>13}  error at the boundary")
+    for name, chain, boundary in (
+            ("legacy", build_legacy_chain(fail), lambda e: None),
+            ("current", build_current_chain(fail), lambda e: log_event_error("on_message", e))):
+        counting_handler.records = 0
+        per_failure, error = await time_failures(chain, boundary)
+        print(f"{name:<12}{per_failure * 1e6:>9.2f} us{counting_handler.records / FAILURES:>13.1f}  "
+              f"{error.__class__.__name__}: {error}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+"""
+Throughput of the single-pass play call parser against the individual parse functions it replaced, and a check
+that both give the same number, play, runoff type, timeout and error on every message in play_calls.txt.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_play_parser
+"""
+import pathlib
+import re
+import time
+
+from fcfb.discord.game import PLAYS_BY_PLAY_TYPE, parse_play_call, validate_play
+from fcfb.main.exceptions import GameError
+
+CORPUS_PATH = pathlib.Path(__file__).parent / "play_calls.txt"
+ROUNDS = 200
+
+
+# The individual parse functions as they were in fcfb.discord.game, kept as the reference for parse_play_call
+def parse_play_number(message_content):
+    """
+    Parse the play number from the message content
+
+    :param message_content:
+    :return:
+    """
+
+    play_number = re.search(r'\b\d+\b', message_content)
+
+    if play_number:
+        return int(play_number.group())
+    else:
+        raise GameError("I could not find a valid number in the message")
+
+
+def parse_normal_play(message_content):
+    """
+    Parse the normal play type from the message content
+
+    :param message_content:
+    :return:
+    """
+
+    play_type_match = re.search(r'\b(run|pass|spike|kneel|field goal|punt)\b', message_content, flags=re.IGNORECASE)
+
+    if play_type_match:
+        return play_type_match.group().lower()
+    else:
+        raise GameError("There was not a valid play in the message, please select **run**, **pass**, **spike**, "
+                        "**kneel**, **field goal**, or **punt** and try again")
+
+
+def parse_kickoff_play(message_content):
+    """
+    Parse the kickoff play type from the message content
+
+    :param message_content:
+    :return:
+    """
+
+    play_type_match = re.search(r'\b(normal|onside|squib)\b', message_content, flags=re.IGNORECASE)
+
+    if play_type_match:
+        return play_type_match.group().lower()
+    else:
+        raise GameError("There was not a valid play in the message, options are **normal**, **onside**, or **squib**")
+
+
+def parse_point_after_play(message_content):
+    """
+    Parse the point after play type from the message content
+
+    :param message_content:
+    :return:
+    """
+
+    play_type_match = re.search(r'\b(two point|pat)\b', message_content, flags=re.IGNORECASE)
+
+    if play_type_match:
+        return play_type_match.group().lower()
+    else:
+        raise GameError("There was not a valid play in the message, options are **two point** or **pat**")
+
+
+def parse_runoff_type(message_content):
+    """
+    Parse the runoff type from the message content
+
+    :param message_content:
+    :return:
+    """
+
+    runoff_match = re.search(r'\b(chew|hurry)\b', message_content, flags=re.IGNORECASE)
+
+    if runoff_match:
+        return runoff_match.group().lower()
+    else:
+        return "normal"
+
+
+def parse_timeout_called(message_content):
+    """
+    Parse the timeout called from the message content
+
+    :param message_content:
+    :return:
+    """
+
+    timeout_match = re.search(r'\b(timeout)\b', message_content, flags=re.IGNORECASE)
+
+    if timeout_match:
+        return True
+    else:
+        return False
+
+
+PLAY_PARSERS = {
+    "NORMAL": parse_normal_play,
+    "KICKOFF": parse_kickoff_play,
+    "POINT AFTER": parse_point_after_play
+}
+
+
+def parse_with_individual_functions(message_content, play_type):
+    try:
+        number = parse_play_number(message_content)
+        play = PLAY_PARSERS[play_type](message_content)
+        return number, play, parse_runoff_type(message_content), parse_timeout_called(message_content)
+    except GameError as e:
+        return str(e)
+
+
+def parse_with_play_call(message_content, play_type):
+    try:
+        play_call = parse_play_call(message_content, play_type)
+        validate_play(play_call.play, play_type)
+        return play_call.number, play_call.play, play_call.runoff_type, play_call.timeout_called
+    except GameError as e:
+        return str(e)
+
+
+def throughput(parse, corpus, play_type):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for message_content in corpus:
+            parse(message_content, play_type)
+    return ROUNDS * len(corpus) / (time.perf_counter() - start)
+
+
+def main():
+    corpus = [line.rstrip("\n") for line in CORPUS_PATH.read_text().splitlines() if line.strip()]
+
+    mismatches = 0
+    for play_type in PLAYS_BY_PLAY_TYPE:
+        for message_content in corpus:
+            expected = parse_with_individual_functions(message_content, play_type)
+            actual = parse_with_play_call(message_content, play_type)
+            if expected != actual:
+                mismatches += 1
+                print(f"MISMATCH [{play_type}] {message_content!r}: {expected!r} != {actual!r}")
+    print(f"{len(corpus)} messages x {len(PLAYS_BY_PLAY_TYPE)} play types, {mismatches} mismatches")
+
+    print(f"{'play type':<14}{'individual':>14}{'single pass':>14}{'speedup':>10}")
+    for play_type in PLAYS_BY_PLAY_TYPE:
+        individual = throughput(parse_with_individual_functions, corpus, play_type)
+        single_pass = throughput(parse_with_play_call, corpus, play_type)
+        print(f"{play_type:<14}{individual:>10.0f}/s {single_pass:>10.0f}/s {single_pass / individual:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Replay recorded Discord messages, and the Zebstrika responses recorded with them, through the bot's message handlers
+against a fake Discord client and a stubbed Zebstrika transport.
+
+Record a fixture by setting parameters.capture_file in the bot's config, then replay it with:
+
+    python -m benchmarks.bench_replay benchmarks/fixtures/sample_game.jsonl
+
+Reports events per second, latency percentiles for parse_commands, parse_game_thread_commands and
+parse_direct_message_number_submission, and outbound Discord and Zebstrika calls per event. Discord sends are not
+rate limited unless --discord-rate is given. Use --save to keep a report and --baseline to fail when throughput drops
+more than --tolerance below a saved one.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import pathlib
+import sys
+import time
+
+import fcfb.api.zebstrika.client as zebstrika_client
+from benchmarks.fakes import CONFIG_DATA, FakeChannel, FakeClient, FakeObject, FakeResponse, FakeThread, \
+    FakeUser, outbound_calls, reset_state
+from fcfb.discord.commands import parse_commands, parse_game_thread_commands, parse_direct_message_number_submission
+from fcfb.discord.context import MessageContext
+from fcfb.discord.scheduler import message_scheduler, DEFAULT_GLOBAL_RATE
+from fcfb.discord.user_index import discord_user_index
+from fcfb.discord.utils import check_if_location_is_game_thread
+from fcfb.main.hypnotoad import compile_result_messages
+from fcfb.main.tracing import tracer, get_trace_id
+
+DEFAULT_FIXTURE = pathlib.Path(__file__).parent / "fixtures" / "sample_game.jsonl"
+MESSAGES_PATH = pathlib.Path(__file__).parent.parent / "fcfb" / "resources" / "messages.json"
+PERCENTILES = (50, 90, 99)
+UNLIMITED_SEND_RATE = 1_000_000
+
+
+class ReplayTransport:
+    """
+    Stand-in for the Zebstrika session that answers each request with the response recorded for it
+
+    A request gets the next response recorded for the same method and path while handling the same message. When the
+    replay makes a call the recording did not, because the cache was colder, it gets the latest response recorded
+    for that path before this message, or a 404 if there is none
+    """
+
+    closed = False
+
+    def __init__(self, responses, trace_order, latency):
+        self.latency = latency
+        self.trace_order = trace_order
+        self.requests = 0
+        self._recorded = responses
+        self._pending = {}
+
+    def reset(self):
+        self._pending = {key: collections.deque(by_trace) for key, by_trace in self._recorded.items()}
+
+    def request(self, method, endpoint, **kwargs):
+        self.requests += 1
+        path = endpoint[len(CONFIG_DATA["api"]["url"]):]
+        status, body = self.find_response((method, path), get_trace_id())
+        return DelayedResponse(status, body, self.latency)
+
+    def find_response(self, key, trace_id):
+        pending = self._pending.get(key)
+        if not pending:
+            return 404, ""
+        position = self.trace_order.get(trace_id, len(self.trace_order))
+        latest = None
+        for recorded_trace, status, body in pending:
+            recorded_position = self.trace_order.get(recorded_trace, -1)
+            if recorded_position == position:
+                pending.remove((recorded_trace, status, body))
+                return status, body
+            if recorded_position < position:
+                latest = (status, body)
+        return latest if latest is not None else (404, "")
+
+    async def close(self):
+        pass
+
+
+class DelayedResponse(FakeResponse):
+    def __init__(self, status, body, latency):
+        super().__init__(status, body)
+        self.latency = latency
+
+    async def __aenter__(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self
+
+
+class ReplayClient(FakeClient):
+    """
+    Fake Discord client that knows every channel in the fixture
+    """
+
+    def __init__(self, latency, channels):
+        super().__init__(latency)
+        self.channels = channels
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        outbound_calls["discord fetch channel"] += 1
+        await asyncio.sleep(self.latency)
+        return self.channels.setdefault(channel_id, FakeChannel(channel_id, self.latency))
+
+
+def load_fixture(path):
+    """
+    Read a fixture recorded by the bot's event recorder
+
+    :param path:
+    :return: The messages in order, and the recorded responses by (method, path)
+    """
+
+    messages = []
+    responses = collections.defaultdict(list)
+    with open(path, 'r') as fixture_file:
+        for line in fixture_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["type"] == "message":
+                messages.append(record)
+            elif record["type"] == "zebstrika":
+                responses[(record["method"], record["path"])].append(
+                    (record["trace"], record["status"], record["body"]))
+    return messages, responses
+
+
+def find_discord_tags(responses):
+    tags = set()
+    for (_, path), recorded in responses.items():
+        if path.startswith("users/"):
+            for _, status, body in recorded:
+                if status == 200 and body:
+                    tags.add(json.loads(body).get("discordTag"))
+    tags.discard(None)
+    return tags
+
+
+def build_discord(messages, responses, latency):
+    """
+    Create a fake channel for every channel and a fake user for every author and coach in the fixture
+
+    :param messages:
+    :param responses:
+    :param latency:
+    :return: The client, and the users by name
+    """
+
+    users = {}
+    for record in messages:
+        author = record["author"]
+        users.setdefault(author["name"], FakeUser(author["id"], author["name"], latency))
+    for tag in find_discord_tags(responses):
+        users.setdefault(tag, FakeUser(10_000 + len(users), tag, latency))
+
+    channels = {}
+    for record in messages:
+        if record["kind"] == "thread":
+            channels[record["channel"]] = FakeThread(record["channel"], latency, record.get("parent") or "games")
+        else:
+            channels.setdefault(record["channel"], FakeChannel(record["channel"], latency))
+    return ReplayClient(latency, channels), users
+
+
+def get_handler_name(record, prefix):
+    if record["content"].startswith(prefix):
+        return parse_commands.__name__
+    if record["kind"] == "dm":
+        return parse_direct_message_number_submission.__name__
+    return parse_game_thread_commands.__name__
+
+
+async def replay_message(client, discord_messages, prefix, record, users):
+    """
+    Route one recorded message the way the bot's handle_message does
+
+    :return: The name of the handler that ran, or None if the message was ignored
+    """
+
+    message = FakeObject(id=len(outbound_calls), content=record["content"], channel=client.channels[record["channel"]],
+                         author=users[record["author"]["name"]], attachments=[])
+    context = MessageContext(CONFIG_DATA, message)
+    if record["content"].startswith(prefix):
+        await parse_commands(client, CONFIG_DATA, discord_messages, prefix, message, context)
+    elif record["kind"] == "dm":
+        await parse_direct_message_number_submission(client, CONFIG_DATA, discord_messages, message, context)
+    elif await check_if_location_is_game_thread(context, message):
+        await parse_game_thread_commands(client, CONFIG_DATA, discord_messages, message, context)
+    else:
+        return None
+    return get_handler_name(record, prefix)
+
+
+async def replay(fixture, rounds, zebstrika_latency, discord_latency, discord_rate):
+    messages, responses = load_fixture(fixture)
+    trace_order = {record["trace"]: position for position, record in enumerate(messages)}
+    transport = ReplayTransport(responses, trace_order, zebstrika_latency)
+    zebstrika_client._session = transport
+    message_scheduler.configure(discord_rate)
+    client, users = build_discord(messages, responses, discord_latency)
+
+    with open(MESSAGES_PATH, 'r') as discord_messages_file:
+        discord_messages = json.load(discord_messages_file)
+    discord_messages["resultMessageIndex"] = compile_result_messages(discord_messages, strict=False)
+    prefix = CONFIG_DATA["parameters"]["prefix"]
+
+    latencies = collections.defaultdict(list)
+    errors = collections.Counter()
+    discord_calls = 0
+    transport.requests = 0
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        reset_state()
+        discord_user_index.build(users.values())
+        transport.reset()
+        for record in messages:
+            # Replay each message under its recorded trace ID, so it is matched with its recorded responses
+            async with tracer.trace("replay") as trace:
+                trace.trace_id = record["trace"]
+                handler_started_at = time.perf_counter()
+                try:
+                    handler_name = await replay_message(client, discord_messages, prefix, record, users)
+                except Exception as e:
+                    handler_name = get_handler_name(record, prefix)
+                    errors[f"{handler_name}: {e.__class__.__name__}"] += 1
+                latencies[handler_name or "ignored"].append(time.perf_counter() - handler_started_at)
+        discord_calls += sum(outbound_calls.values())
+    elapsed = time.perf_counter() - started_at
+
+    events = rounds * len(messages)
+    return {
+        "fixture": str(fixture),
+        "events": events,
+        "eventsPerSecond": events / elapsed,
+        "handlers": {name: {f"p{percentile}": percentile_of(samples, percentile) * 1000 for percentile in PERCENTILES}
+                     | {"count": len(samples)} for name, samples in latencies.items()},
+        "zebstrikaCallsPerEvent": transport.requests / events,
+        "discordCallsPerEvent": discord_calls / events,
+        "errors": dict(errors)
+    }
+
+
+def percentile_of(samples, percentile):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def print_report(report):
+    print(f"{report['events']} events from {report['fixture']}")
+    print(f"{report['eventsPerSecond']:.0f} events/s, {report['zebstrikaCallsPerEvent']:.2f} Zebstrika calls and "
+          f"{report['discordCallsPerEvent']:.2f} Discord calls per event")
+    print(f"{'handler':<42}{'count':>7}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES))
+    for name, stats in report["handlers"].items():
+        print(f"{name:<42}{stats['count']:>7}" + "".join(f"{stats['p' + str(p)]:>8.2f}ms" for p in PERCENTILES))
+    for error, count in report["errors"].items():
+        print(f"error {error} x{count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded fixture through the bot's message handlers")
+    parser.add_argument("fixture", nargs="?", default=DEFAULT_FIXTURE)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--zebstrika-latency", type=float, default=0, help="seconds per Zebstrika call")
+    parser.add_argument("--discord-latency", type=float, default=0, help="seconds per Discord call")
+    parser.add_argument("--discord-rate", type=float, default=UNLIMITED_SEND_RATE,
+                        help=f"Discord sends per second, the bot's default is {DEFAULT_GLOBAL_RATE}")
+    parser.add_argument("--save", help="write the report to this JSON file")
+    parser.add_argument("--baseline", help="fail if throughput is below this saved report's")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed throughput drop, as a fraction")
+    arguments = parser.parse_args()
+
+    report = asyncio.run(replay(arguments.fixture, arguments.rounds, arguments.zebstrika_latency,
+                                arguments.discord_latency, arguments.discord_rate))
+    print_report(report)
+
+    if arguments.save:
+        with open(arguments.save, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        floor = baseline["eventsPerSecond"] * (1 - arguments.tolerance)
+        if report["eventsPerSecond"] < floor:
+            print(f"REGRESSION: {report['eventsPerSecond']:.0f} events/s is below {floor:.0f} events/s")
+            sys.exit(1)
+        print(f"OK: within {arguments.tolerance:.0%} of the baseline's {baseline['eventsPerSecond']:.0f} events/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Check that a game read issued after a write sees the write, even while a read that started before the write is
+still in flight, and that the pre-write response does not end up in the game cache. Also check that a write to
+another game neither splits the reads nor keeps their response out of the cache.
+
+Run from the repository root, exits non-zero on failure:
+
+    python -m benchmarks.check_read_after_write
+"""
+import asyncio
+import json
+import sys
+
+import fcfb.api.zebstrika.client as zebstrika_client
+from benchmarks.fakes import CONFIG_DATA, GAME_ID, FakeResponse, make_game_object, reset_caches
+from fcfb.api.zebstrika.cache import game_cache
+from fcfb.api.zebstrika.games import get_ongoing_game_by_id, update_waiting_on
+
+
+class GatedSession:
+    """
+    Session whose GETs answer with the game as it was when they were sent, once the gate opens
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.game_object = make_game_object(waitingOn="before")
+        self.gate = asyncio.Event()
+        self.gets = 0
+
+    def request(self, method, endpoint, **kwargs):
+        path = endpoint[len(CONFIG_DATA["api"]["url"]):]
+        if path.startswith("games/waiting_on/"):
+            _, _, game_id, username = path.split("/")
+            if game_id == str(GAME_ID):
+                self.game_object["waitingOn"] = username
+            return FakeResponse(200, "")
+
+        self.gets += 1
+        session = self
+        body = json.dumps(self.game_object)
+
+        class GatedResponse(FakeResponse):
+            async def __aenter__(self):
+                await session.gate.wait()
+                return self
+
+        return GatedResponse(200, body)
+
+    async def close(self):
+        pass
+
+
+async def wait_for_gets(session, count):
+    while session.gets < count:
+        await asyncio.sleep(0)
+
+
+async def read_around_write(written_game_id):
+    """
+    Read the game, write waitingOn for a game while the read is in flight, then read the game again
+
+    :param written_game_id:
+    :return: The session, what the read after the write returned and what the game cache holds
+    """
+
+    session = GatedSession()
+    zebstrika_client._session = session
+    reset_caches()
+
+    read_before_write = asyncio.ensure_future(get_ongoing_game_by_id(CONFIG_DATA, GAME_ID))
+    await wait_for_gets(session, 1)
+    await update_waiting_on(CONFIG_DATA, written_game_id, "after")
+    read_after_write = asyncio.ensure_future(get_ongoing_game_by_id(CONFIG_DATA, GAME_ID))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    session.gate.set()
+    await asyncio.gather(read_before_write, read_after_write)
+    return session, read_after_write.result(), game_cache.get_by_game_id(GAME_ID)
+
+
+async def main():
+    failures = []
+
+    session, game_object, cached = await read_around_write(GAME_ID)
+    if game_object["waitingOn"] != "after":
+        failures.append(f"read after the write returned waitingOn {game_object['waitingOn']!r}")
+    if cached is not None and cached["waitingOn"] != "after":
+        failures.append(f"game cache holds waitingOn {cached['waitingOn']!r}")
+    print(f"same game: {session.gets} GETs sent, read after the write saw waitingOn {game_object['waitingOn']!r}, "
+          f"cache holds {cached['waitingOn'] if cached is not None else None!r}")
+
+    session, game_object, cached = await read_around_write(GAME_ID + 1)
+    if session.gets != 1:
+        failures.append(f"a write to another game split the reads into {session.gets} GETs")
+    if cached is None:
+        failures.append("a write to another game kept the read out of the game cache")
+    print(f"other game: {session.gets} GETs sent, game {'cached' if cached is not None else 'not cached'}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
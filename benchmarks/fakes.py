@@ -0,0 +1,235 @@
+import asyncio
+import collections
+import json
+
+import discord
+
+import fcfb.api.zebstrika.client as zebstrika_client
+from fcfb.api.zebstrika.cache import game_cache, user_cache
+from fcfb.discord.game_store import game_store
+from fcfb.discord.thread_index import game_thread_index
+from fcfb.discord.user_index import discord_user_index
+from fcfb.discord.utils import fetched_threads
+
+HOME_TEAM = "Ohio State"
+AWAY_TEAM = "Michigan"
+THREAD_ID = 555
+GAME_ID = 7
+
+CONFIG_DATA = {
+    "api": {"url": "http://zebstrika/"},
+    "discord": {"game_channel_id": 1, "token": ""},
+    "parameters": {"prefix": "!"}
+}
+
+
+def make_game_object(**overrides):
+    game_object = {
+        "gameId": GAME_ID, "homeTeam": HOME_TEAM, "awayTeam": AWAY_TEAM,
+        "homePlatform": "Discord", "homePlatformId": THREAD_ID,
+        "awayPlatform": "Discord", "awayPlatformId": THREAD_ID,
+        "homeScore": 7, "awayScore": 3, "down": 1, "yardsToGo": 10, "ballLocation": 25,
+        "quarter": 1, "clock": "7:00", "gameTimer": "10:00 PM",
+        "possession": "home", "waitingOn": "home_coach", "currentPlayType": "NORMAL", "currentPlayId": 99,
+        "coinTossWinner": HOME_TEAM, "coinTossChoice": "receive"
+    }
+    game_object.update(overrides)
+    return game_object
+
+
+USER_OBJECTS = {
+    HOME_TEAM: {"username": "home_coach", "discordTag": "home_coach", "team": HOME_TEAM},
+    AWAY_TEAM: {"username": "away_coach", "discordTag": "away_coach", "team": AWAY_TEAM}
+}
+
+# Discord calls made through the fakes, by kind
+outbound_calls = collections.Counter()
+
+PLAY_RESULT = {
+    "possession": "away", "homeTeam": HOME_TEAM, "awayTeam": AWAY_TEAM, "ballLocation": 30,
+    "result": "YARDS", "actualResult": "GAIN", "yards": 5
+}
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self._body = body
+
+    async def text(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeZebstrikaSession:
+    """
+    Stand-in for the shared aiohttp session that answers from canned objects after a fixed latency
+    """
+
+    closed = False
+
+    def __init__(self, latency, game_object=None):
+        self.latency = latency
+        self.game_object = game_object or make_game_object()
+        self.requests = []
+
+    def request(self, method, endpoint, **kwargs):
+        self.requests.append((method, endpoint))
+        return self._respond(endpoint.split(CONFIG_DATA["api"]["url"], 1)[1])
+
+    def _respond(self, path):
+        session = self
+
+        class DelayedResponse(FakeResponse):
+            async def __aenter__(self):
+                await asyncio.sleep(session.latency)
+                return self
+
+        if path.startswith("users/team/"):
+            return DelayedResponse(200, json.dumps(USER_OBJECTS[path.split("/")[-1]]))
+        if "offense_submitted" in path:
+            return DelayedResponse(200, json.dumps(PLAY_RESULT))
+        if path.startswith("game_plays/") or path.startswith("games/waiting_on"):
+            return DelayedResponse(200, "")
+        return DelayedResponse(200, json.dumps(self.game_object))
+
+    async def close(self):
+        pass
+
+
+class FakeObject:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeMessage:
+    def __init__(self, message_id, channel, content=None):
+        self.id = message_id
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, **kwargs):
+        outbound_calls["discord edit"] += 1
+        await asyncio.sleep(self.channel.latency)
+        self.channel.edits.append(self.id)
+        return self
+
+    async def pin(self):
+        outbound_calls["discord pin"] += 1
+        await asyncio.sleep(self.channel.latency)
+
+
+class FakeChannel:
+    def __init__(self, channel_id, latency):
+        self.id = channel_id
+        self.name = "games"
+        self.latency = latency
+        self.sent = []
+        self.edits = []
+
+    async def send(self, content=None, embed=None, **kwargs):
+        outbound_calls["discord send"] += 1
+        await asyncio.sleep(self.latency)
+        self.sent.append(content)
+        return FakeMessage(len(self.sent), self, content)
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(message_id, self)
+
+    def history(self, limit=100):
+        outbound_calls["discord history"] += 1
+
+        async def empty():
+            return
+            yield
+        return empty()
+
+
+class FakeThread(FakeChannel, discord.Thread):
+    """
+    Fake channel that passes as a thread in the given forum
+    """
+
+    def __init__(self, channel_id, latency, parent_name="games"):
+        super().__init__(channel_id, latency)
+        self.parent_name = parent_name
+
+    @property
+    def parent(self):
+        return FakeObject(name=self.parent_name)
+
+
+class FakeUser:
+    def __init__(self, user_id, name, latency):
+        self.id = user_id
+        self.name = name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, content=None, embed=None, **kwargs):
+        outbound_calls["discord dm"] += 1
+        await asyncio.sleep(self.latency)
+        self.sent.append(content)
+        return FakeObject(id=len(self.sent), content=content)
+
+
+class FakeClient:
+    def __init__(self, latency):
+        self.latency = latency
+        self.user = FakeUser(1, "Hypnotoad", latency)
+        self.thread = FakeChannel(THREAD_ID, latency)
+        self.guilds = []
+
+    def get_channel(self, channel_id):
+        return self.thread if channel_id == THREAD_ID else None
+
+    async def fetch_channel(self, channel_id):
+        outbound_calls["discord fetch channel"] += 1
+        await asyncio.sleep(self.latency)
+        return self.thread
+
+
+def install_fakes(zebstrika_latency, discord_latency, game_object=None):
+    """
+    Point the Zebstrika client and Discord helpers at the fakes and return them
+
+    :param zebstrika_latency:
+    :param discord_latency:
+    :param game_object:
+    :return:
+    """
+
+    session = FakeZebstrikaSession(zebstrika_latency, game_object)
+    zebstrika_client._session = session
+    client = FakeClient(discord_latency)
+    home_user = FakeUser(101, "home_coach", discord_latency)
+    away_user = FakeUser(102, "away_coach", discord_latency)
+    discord_user_index.build([home_user, away_user])
+    reset_caches()
+    return session, client, home_user, away_user
+
+
+def reset_caches():
+    game_cache.clear()
+    user_cache.clear()
+
+
+def reset_state():
+    """
+    Clear the caches and everything the bot remembers about games, as if it had just started
+
+    :return:
+    """
+
+    reset_caches()
+    fetched_threads.clear()
+    game_thread_index.clear()
+    game_store.clear()
+    outbound_calls.clear()
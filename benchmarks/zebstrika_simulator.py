@@ -0,0 +1,692 @@
+"""
+Stand-in for the Zebstrika API that keeps games in memory, for load testing the bot without the real backend.
+
+Serves every games/, game_plays/ and users/ endpoint the bot's client calls, plays each submitted play out with a
+simple number-difference model, and can add latency, errors and slow responses to any route. Run it from the
+repository root and point api.url in the bot's config at it:
+
+    python -m benchmarks.zebstrika_simulator --port 8081 --latency lognormal:0.04:0.5 --error-rate 0.02
+
+Latencies are given as "fixed:SECONDS", "uniform:LOW:HIGH", "normal:MEAN:STDDEV", "lognormal:MEDIAN:SIGMA" or
+"exponential:MEAN". --route-latency overrides the latency of one route, using the client's route names, e.g.
+--route-latency games/ongoing/discord=fixed:0.3. --slow-rate sends a share of responses after --slow-latency
+instead, and --brownout-every/--brownout-for/--brownout-factor slow every response down for a window at a time.
+
+The faults can be changed while it runs with PUT /_simulator/faults, taking the same settings as JSON, e.g.
+{"error_rate": 0.5, "latency": "fixed:2"}. GET /_simulator/stats counts requests by route and status, and
+POST /_simulator/reset forgets every game.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import random
+import time
+
+from aiohttp import web
+
+from fcfb.main.logging_config import configure_logging
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8081
+DEFAULT_ERROR_STATUSES = (500, 502, 503)
+QUARTER_SECONDS = 7 * 60
+PLAY_SECONDS = {"normal": 30, "chew": 40, "hurry": 12}
+TIMEOUT_SECONDS = 20
+KICKOFF_BALL_LOCATION = 35
+TOUCHBACK_BALL_LOCATION = 25
+PUNT_YARDS = 40
+MAX_DIFFERENCE = 750
+
+# Kickoff results by the largest number difference they are returned for
+KICKOFF_RESULTS = {
+    "normal": ((3, "RETURN TOUCHDOWN"), (12, "FUMBLE"), (150, "20"), (300, "TOUCHBACK"), (400, "30"), (480, "35"),
+               (560, "40"), (640, "45"), (720, "50"), (744, "65"), (MAX_DIFFERENCE, "TOUCHDOWN")),
+    "squib": ((3, "RETURN TOUCHDOWN"), (20, "FUMBLE"), (200, "30"), (400, "35"), (550, "40"), (700, "45"),
+              (744, "50"), (MAX_DIFFERENCE, "TOUCHDOWN"))
+}
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyDistribution:
+    """
+    Response delay drawn from a named distribution, parsed from "kind:parameter[:parameter]"
+    """
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, spec):
+        kind, *parameters = spec.split(":")
+        if kind not in self.KINDS or len(parameters) != self.KINDS[kind]:
+            raise ValueError(f"Invalid latency {spec}, expected one of fixed:SECONDS, uniform:LOW:HIGH, "
+                             f"normal:MEAN:STDDEV, lognormal:MEDIAN:SIGMA or exponential:MEAN")
+        self.spec = spec
+        self.kind = kind
+        self.parameters = [float(parameter) for parameter in parameters]
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            return self.parameters[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.parameters)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.parameters))
+        if self.kind == "lognormal":
+            median, sigma = self.parameters
+            return median * rng.lognormvariate(0, sigma)
+        return rng.expovariate(1 / self.parameters[0]) if self.parameters[0] > 0 else 0.0
+
+    def __str__(self):
+        return self.spec
+
+
+class FaultProfile:
+    """
+    Latency, errors and slow responses added to each request
+    """
+
+    def __init__(self, latency="fixed:0", route_latency=None, error_rate=0.0, error_statuses=DEFAULT_ERROR_STATUSES,
+                 slow_rate=0.0, slow_latency=30.0, brownout_every=0.0, brownout_for=0.0, brownout_factor=10.0):
+        self.latency = LatencyDistribution(latency)
+        self.route_latency = {route: LatencyDistribution(spec) for route, spec in (route_latency or {}).items()}
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.brownout_every = brownout_every
+        self.brownout_for = brownout_for
+        self.brownout_factor = brownout_factor
+        self.started_at = time.monotonic()
+
+    def in_brownout(self):
+        if self.brownout_every <= 0:
+            return False
+        return (time.monotonic() - self.started_at) % self.brownout_every < self.brownout_for
+
+    def get_delay(self, route, rng):
+        """
+        Get how long to wait before answering a request to the route
+
+        :param route:
+        :param rng:
+        :return: The delay in seconds, and whether it was a slow response
+        """
+
+        if self.slow_rate and rng.random() < self.slow_rate:
+            return self.slow_latency, True
+        delay = self.route_latency.get(route, self.latency).sample(rng)
+        if self.in_brownout():
+            delay *= self.brownout_factor
+        return delay, False
+
+    def get_error_status(self, rng):
+        if self.error_rate and rng.random() < self.error_rate:
+            return rng.choice(self.error_statuses)
+        return None
+
+    def update(self, settings):
+        """
+        Change some of the settings, taking the same names as the constructor, and restart the brownout cycle
+
+        :param settings:
+        :return:
+        """
+
+        # Parse everything before changing anything, so an invalid setting leaves the profile as it was
+        latency = LatencyDistribution(settings["latency"]) if "latency" in settings else self.latency
+        route_latency = {route: LatencyDistribution(spec) for route, spec in settings["route_latency"].items()} \
+            if "route_latency" in settings else self.route_latency
+        numbers = {name: float(settings[name]) for name in ("error_rate", "slow_rate", "slow_latency", "brownout_every",
+                                                            "brownout_for", "brownout_factor") if name in settings}
+        error_statuses = tuple(int(status) for status in settings["error_statuses"]) \
+            if "error_statuses" in settings else self.error_statuses
+
+        self.latency = latency
+        self.route_latency = route_latency
+        self.error_statuses = error_statuses
+        for name, value in numbers.items():
+            setattr(self, name, value)
+        self.started_at = time.monotonic()
+
+    def to_dict(self):
+        return {"latency": str(self.latency),
+                "route_latency": {route: str(latency) for route, latency in self.route_latency.items()},
+                "error_rate": self.error_rate, "error_statuses": list(self.error_statuses),
+                "slow_rate": self.slow_rate, "slow_latency": self.slow_latency, "brownout_every": self.brownout_every,
+                "brownout_for": self.brownout_for, "brownout_factor": self.brownout_factor}
+
+
+class SimulatorError(Exception):
+    """
+    Request the simulated Zebstrika refuses, answered with the given HTTP status
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class GameSimulator:
+    """
+    In-memory games, plays and coaches, changed the way Zebstrika changes them
+
+    Ball locations are yards from the offense's own goal line. A game is marked final once the fourth quarter runs out
+    and stays readable until it is deleted. Coaches are created for each team the first time a
+    game is started with it, unless they were loaded with load_users
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.games = {}
+        self.users = {}
+        self._play_games = {}
+        self._defensive_numbers = {}
+        self._game_ids = itertools.count(1)
+        self._play_ids = itertools.count(1)
+
+    def reset(self):
+        self.games.clear()
+        self._play_games.clear()
+        self._defensive_numbers.clear()
+
+    def load_users(self, users):
+        """
+        Add coaches from a list of user objects with username, discordTag and team
+
+        :param users:
+        :return:
+        """
+
+        for user in users:
+            self.users[user["team"]] = user
+
+    def get_user_by_team(self, team):
+        if team not in self.users:
+            raise SimulatorError(404, f"No user found for team {team}")
+        return self.users[team]
+
+    def ensure_user(self, team):
+        if team not in self.users:
+            username = team.lower().replace(" ", "_") + "_coach"
+            self.users[team] = {"username": username, "discordTag": username, "team": team}
+        return self.users[team]
+
+    def get_game(self, game_id):
+        game_object = self.games.get(int(game_id))
+        if game_object is None:
+            raise SimulatorError(404, f"No ongoing game found with ID {game_id}")
+        return game_object
+
+    def get_game_by_platform_id(self, platform_id):
+        for game_object in self.games.values():
+            if str(platform_id) in (str(game_object["homePlatformId"]), str(game_object["awayPlatformId"])):
+                return game_object
+        raise SimulatorError(404, f"No ongoing game found in {platform_id}")
+
+    def start_game(self, home_platform, home_platform_id, away_platform, away_platform_id, season, week, subdivision,
+                   home_team, away_team, tv_channel, start_time, location, is_scrimmage):
+        for team in (home_team, away_team):
+            if any(team in (game["homeTeam"], game["awayTeam"]) and game["gameStatus"] != "FINAL"
+                   for game in self.games.values()):
+                raise SimulatorError(400, f"{team} is already playing a game")
+
+        away_coach = self.ensure_user(away_team)
+        self.ensure_user(home_team)
+        game_id = next(self._game_ids)
+        game_object = {
+            "gameId": game_id, "homeTeam": home_team, "awayTeam": away_team,
+            "homePlatform": home_platform, "homePlatformId": parse_platform_id(home_platform_id),
+            "awayPlatform": away_platform, "awayPlatformId": parse_platform_id(away_platform_id),
+            "season": int(season), "week": int(week), "subdivision": subdivision, "tvChannel": tv_channel,
+            "startTime": start_time, "location": location, "scrimmage": is_scrimmage.lower() in ("yes", "true"),
+            "homeScore": 0, "awayScore": 0, "quarter": 1, "clock": format_clock(QUARTER_SECONDS),
+            "down": 1, "yardsToGo": 10, "ballLocation": KICKOFF_BALL_LOCATION, "possession": "home",
+            "waitingOn": away_coach["username"], "currentPlayType": "KICKOFF", "currentPlayId": next(self._play_ids),
+            "coinTossWinner": "None", "coinTossChoice": "None", "gameTimer": get_game_timer(),
+            "gameStatus": "IN PROGRESS"
+        }
+        self.games[game_id] = game_object
+        self._play_games[game_object["currentPlayId"]] = game_id
+        return game_object
+
+    def delete_game(self, game_id):
+        game_object = self.get_game(game_id)
+        del self.games[game_object["gameId"]]
+        self._play_games.pop(game_object["currentPlayId"], None)
+        self._defensive_numbers.pop(game_object["gameId"], None)
+
+    def run_coin_toss(self, game_id, call):
+        game_object = self.get_game(game_id)
+        if game_object["coinTossWinner"] != "None":
+            raise SimulatorError(400, "The coin toss has already been run")
+        if call not in ("heads", "tails"):
+            raise SimulatorError(400, f"Invalid coin toss call {call}")
+        # The away team calls the toss
+        won = self.rng.choice(("heads", "tails")) == call
+        game_object["coinTossWinner"] = game_object["awayTeam"] if won else game_object["homeTeam"]
+        return game_object
+
+    def update_coin_toss_choice(self, game_id, choice):
+        game_object = self.get_game(game_id)
+        if game_object["coinTossWinner"] == "None" or game_object["coinTossChoice"] != "None":
+            raise SimulatorError(400, "The game is not waiting on a coin toss choice")
+        if choice not in ("receive", "defer"):
+            raise SimulatorError(400, f"Invalid coin toss choice {choice}")
+        game_object["coinTossChoice"] = choice
+        winner = "home" if game_object["coinTossWinner"] == game_object["homeTeam"] else "away"
+        receiving = winner if choice == "receive" else flip(winner)
+        set_kickoff(game_object, flip(receiving))
+        return game_object
+
+    def update_waiting_on(self, game_id, username):
+        game_object = self.get_game(game_id)
+        game_object["waitingOn"] = username
+        return game_object
+
+    def submit_defensive_number(self, game_id, number, timeout_called):
+        game_object = self.get_game(game_id)
+        if game_object["gameStatus"] == "FINAL":
+            raise SimulatorError(400, "The game is over")
+        self._defensive_numbers[game_object["gameId"]] = (parse_number(number), timeout_called.lower() == "true")
+        return game_object
+
+    def submit_offensive_number(self, play_id, number, play, runoff_type, offensive_timeout, defensive_timeout):
+        """
+        Run the current play of the game it belongs to
+
+        :return: The play result, with the possession and ball location after the play
+        """
+
+        game_id = self._play_games.get(int(play_id))
+        if game_id is None or game_id not in self.games:
+            raise SimulatorError(404, f"No ongoing play found with ID {play_id}")
+        game_object = self.games[game_id]
+        if game_id not in self._defensive_numbers:
+            raise SimulatorError(400, "The defense has not submitted a number for this play")
+        defensive_number, _ = self._defensive_numbers.pop(game_id)
+        difference = get_difference(parse_number(number), defensive_number)
+
+        offense = game_object["possession"]
+        result, actual_result, yards = run_play(game_object, play.lower(), difference)
+        play_result = {"playId": int(play_id), "offensiveNumber": int(number), "defensiveNumber": defensive_number,
+                       "difference": difference, "play": play.upper(), "result": result,
+                       "actualResult": actual_result, "yards": yards, "offense": offense}
+
+        run_clock(game_object, runoff_type, "true" in (offensive_timeout.lower(), defensive_timeout.lower()))
+        del self._play_games[int(play_id)]
+        if game_object["quarter"] > 4:
+            game_object.update(gameStatus="FINAL", quarter=4, clock=format_clock(0))
+        else:
+            game_object["currentPlayId"] = next(self._play_ids)
+            self._play_games[game_object["currentPlayId"]] = game_id
+            game_object["gameTimer"] = get_game_timer()
+
+        play_result.update(possession=game_object["possession"], homeTeam=game_object["homeTeam"],
+                           awayTeam=game_object["awayTeam"], ballLocation=game_object["ballLocation"],
+                           homeScore=game_object["homeScore"], awayScore=game_object["awayScore"])
+        return play_result
+
+
+def run_play(game_object, play, difference):
+    """
+    Change the game for the play and get its result
+
+    :param game_object:
+    :param play: The play as the bot sends it, e.g. "run" or "kickoff onside".
+    :param difference: Difference between the offensive and defensive numbers, from 0 to 750.
+    :return: The result, actual result and yards gained
+    """
+
+    if play.startswith("kickoff "):
+        return run_kickoff(game_object, play.split(" ", 1)[1], difference)
+    if play in ("pat", "two point"):
+        return run_point_after(game_object, play, difference)
+    if play in ("run", "pass"):
+        return run_scrimmage_play(game_object, play, difference)
+    if play == "spike":
+        advance_down(game_object, 0)
+        return "SPIKE", "SPIKE", 0
+    if play == "kneel":
+        advance_down(game_object, -2)
+        return "KNEEL", "KNEEL", -2
+    if play == "field goal":
+        distance = 117 - game_object["ballLocation"]
+        if difference >= distance * 5:
+            score(game_object, game_object["possession"], 3)
+            set_kickoff(game_object, game_object["possession"])
+            return "GOOD", "GOOD", 0
+        change_possession(game_object, max(100 - game_object["ballLocation"], 20))
+        return "NO GOOD", "NO GOOD", 0
+    if play == "punt":
+        change_possession(game_object, max(100 - game_object["ballLocation"] - PUNT_YARDS, 20))
+        return "PUNT", "PUNT", PUNT_YARDS
+    raise SimulatorError(400, f"Invalid play {play}")
+
+
+def run_kickoff(game_object, kick, difference):
+    kicking = game_object["possession"]
+    if kick == "onside":
+        if difference <= 120:
+            game_object.update(ballLocation=KICKOFF_BALL_LOCATION + 10, currentPlayType="NORMAL", down=1, yardsToGo=10)
+            return "RECOVERED", "ONSIDE KICK RECOVERED", 0
+        change_possession(game_object, 100 - KICKOFF_BALL_LOCATION - 10)
+        return "NO GOOD", "ONSIDE KICK FAILED", 0
+
+    result = next(result for largest, result in KICKOFF_RESULTS[kick] if difference <= largest)
+    if result == "RETURN TOUCHDOWN":
+        change_possession(game_object, 100)
+        touchdown(game_object, flip(kicking))
+        return result, result, 100
+    if result == "TOUCHDOWN":
+        touchdown(game_object, kicking)
+        return result, "KICKING TEAM TOUCHDOWN", 0
+    if result == "FUMBLE":
+        game_object.update(ballLocation=80, currentPlayType="NORMAL", down=1, yardsToGo=10)
+        return result, "MUFFED KICK", 0
+    change_possession(game_object, TOUCHBACK_BALL_LOCATION if result == "TOUCHBACK" else int(result))
+    return result, "KICKOFF", 0
+
+
+def run_point_after(game_object, play, difference):
+    offense = game_object["possession"]
+    if difference <= 2:
+        score(game_object, flip(offense), 2)
+        result = "DEFENSE TWO POINT"
+    elif (play == "pat" and difference <= 700) or (play == "two point" and difference >= 450):
+        score(game_object, offense, 1 if play == "pat" else 2)
+        result = "GOOD"
+    else:
+        result = "NO GOOD"
+    set_kickoff(game_object, offense)
+    return result, result, 0
+
+
+def run_scrimmage_play(game_object, play, difference):
+    offense = game_object["possession"]
+    if difference <= 3:
+        change_possession(game_object, 100)
+        touchdown(game_object, flip(offense))
+        return "PICK/FUMBLE 6", "TURNOVER TOUCHDOWN", 0
+    if difference <= 20:
+        change_possession(game_object, 100 - game_object["ballLocation"])
+        return "TURNOVER", "TURNOVER", 0
+
+    no_gain_below = 250 if play == "pass" else 200
+    if difference >= no_gain_below:
+        yards = (difference - no_gain_below) // (15 if play == "pass" else 25) + 1
+    elif play == "run" and difference <= 75:
+        yards = -3
+    else:
+        result = "INCOMPLETE" if play == "pass" else "NO GAIN"
+        return result, advance_down(game_object, 0) or "NO GAIN", 0
+
+    if game_object["ballLocation"] + yards >= 100:
+        yards = 100 - game_object["ballLocation"]
+        touchdown(game_object, offense)
+        return f"{yards} YARDS", "TOUCHDOWN", yards
+    if game_object["ballLocation"] + yards <= 0:
+        score(game_object, flip(offense), 2)
+        set_kickoff(game_object, offense)
+        return f"{yards} YARDS", "SAFETY", yards
+    actual_result = advance_down(game_object, yards)
+    return f"{yards} YARDS", actual_result or ("GAIN" if yards >= 0 else "LOSS"), yards
+
+
+def advance_down(game_object, yards):
+    """
+    Move the ball and the down after a play that kept possession
+
+    :return: "FIRST DOWN" or "TURNOVER ON DOWNS" when the play led to one, otherwise None
+    """
+
+    game_object["ballLocation"] += yards
+    if yards >= game_object["yardsToGo"]:
+        game_object.update(down=1, yardsToGo=min(10, 100 - game_object["ballLocation"]))
+        return "FIRST DOWN"
+    if game_object["down"] == 4:
+        change_possession(game_object, 100 - game_object["ballLocation"])
+        return "TURNOVER ON DOWNS"
+    game_object["down"] += 1
+    game_object["yardsToGo"] -= yards
+    return None
+
+
+def change_possession(game_object, ball_location):
+    game_object.update(possession=flip(game_object["possession"]), ballLocation=ball_location,
+                       currentPlayType="NORMAL", down=1, yardsToGo=min(10, 100 - ball_location))
+
+
+def touchdown(game_object, team):
+    score(game_object, team, 6)
+    game_object.update(possession=team, ballLocation=97, currentPlayType="POINT AFTER", down=1, yardsToGo=3)
+
+
+def set_kickoff(game_object, kicking):
+    game_object.update(possession=kicking, ballLocation=KICKOFF_BALL_LOCATION, currentPlayType="KICKOFF", down=1,
+                       yardsToGo=10)
+
+
+def score(game_object, team, points):
+    game_object[f"{team}Score"] += points
+
+
+def run_clock(game_object, runoff_type, timeout_called):
+    minutes, seconds = game_object["clock"].split(":")
+    remaining = int(minutes) * 60 + int(seconds)
+    remaining -= TIMEOUT_SECONDS if timeout_called else PLAY_SECONDS.get(runoff_type, PLAY_SECONDS["normal"])
+    if remaining <= 0:
+        game_object["quarter"] += 1
+        remaining = QUARTER_SECONDS
+    game_object["clock"] = format_clock(remaining)
+
+
+def flip(side):
+    return "away" if side == "home" else "home"
+
+
+def get_difference(offensive_number, defensive_number):
+    difference = abs(offensive_number - defensive_number)
+    return min(difference, 1500 - difference)
+
+
+def parse_number(number):
+    try:
+        return int(number)
+    except ValueError:
+        raise SimulatorError(400, f"Invalid number {number}")
+
+
+def parse_platform_id(platform_id):
+    return int(platform_id) if platform_id.isdigit() else platform_id
+
+
+def format_clock(seconds):
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def get_game_timer():
+    return time.strftime("%I:%M %p", time.localtime(time.time() + 24 * 60 * 60))
+
+
+def json_response(body, status=200):
+    return web.Response(text=json.dumps(body), status=status, content_type="application/json")
+
+
+def create_app(simulator, faults):
+    """
+    Create the simulator's web app
+
+    :param simulator: Game state.
+    :param faults: Fault profile applied to every Zebstrika route.
+    :return:
+    """
+
+    stats = collections.Counter()
+    route_names = {}
+
+    @web.middleware
+    async def inject_faults(request, handler):
+        route = route_names.get(request.match_info.route)
+        if route is None:
+            return await handler(request)
+
+        delay, slow = faults.get_delay(route, simulator.rng)
+        if slow:
+            stats["slow"] += 1
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        error_status = faults.get_error_status(simulator.rng)
+        if error_status is not None:
+            stats[f"{route} {error_status} injected"] += 1
+            return web.Response(text="Simulated error", status=error_status)
+        try:
+            response = await handler(request)
+        except SimulatorError as e:
+            response = web.Response(text=str(e), status=e.status)
+        stats[f"{route} {response.status}"] += 1
+        return response
+
+    async def get_ongoing_game_by_thread_id(request):
+        return json_response(simulator.get_game_by_platform_id(request.match_info["thread_id"]))
+
+    async def get_ongoing_game_by_id(request):
+        return json_response(simulator.get_game(request.match_info["game_id"]))
+
+    async def start_game(request):
+        return json_response(simulator.start_game(**request.match_info), status=201)
+
+    async def run_coin_toss(request):
+        return json_response(simulator.run_coin_toss(request.match_info["game_id"], request.match_info["call"]))
+
+    async def update_coin_toss_choice(request):
+        return json_response(simulator.update_coin_toss_choice(request.match_info["game_id"],
+                                                               request.match_info["choice"]))
+
+    async def update_waiting_on(request):
+        return json_response(simulator.update_waiting_on(request.match_info["game_id"],
+                                                         request.match_info["username"]))
+
+    async def delete_game(request):
+        simulator.delete_game(request.match_info["game_id"])
+        return web.Response(status=200)
+
+    async def submit_defensive_number(request):
+        return json_response(simulator.submit_defensive_number(**request.match_info))
+
+    async def submit_offensive_number(request):
+        return json_response(simulator.submit_offensive_number(**request.match_info))
+
+    async def get_user_by_team(request):
+        return json_response(simulator.get_user_by_team(request.match_info["team"]))
+
+    async def get_stats(request):
+        return json_response({"games": len(simulator.games), "requests": dict(stats), "faults": faults.to_dict()})
+
+    async def update_faults(request):
+        try:
+            faults.update(await request.json())
+        except (ValueError, TypeError) as e:
+            return web.Response(text=str(e), status=400)
+        return json_response(faults.to_dict())
+
+    async def reset(request):
+        simulator.reset()
+        stats.clear()
+        return web.Response(status=200)
+
+    app = web.Application(middlewares=[inject_faults])
+    # Named the way the bot's client names them, for --route-latency and the stats
+    for method, path, handler, route in (
+            ("GET", "/games/ongoing/discord/{thread_id}", get_ongoing_game_by_thread_id, "games/ongoing/discord"),
+            ("GET", "/games/game_id/{game_id}", get_ongoing_game_by_id, "games/game_id"),
+            ("POST", "/games/start/{home_platform}/{home_platform_id}/{away_platform}/{away_platform_id}/{season}/"
+                     "{week}/{subdivision}/{home_team}/{away_team}/{tv_channel}/{start_time}/{location}/"
+                     "{is_scrimmage}", start_game, "games/start"),
+            ("PUT", "/games/coin_toss/{game_id}/{call}", run_coin_toss, "games/coin_toss"),
+            ("PUT", "/games/coin_toss_choice/{game_id}/{choice}", update_coin_toss_choice, "games/coin_toss_choice"),
+            ("PUT", "/games/waiting_on/{game_id}/{username}", update_waiting_on, "games/waiting_on"),
+            ("DELETE", "/games/{game_id}", delete_game, "games/delete"),
+            ("POST", "/game_plays/defense_submitted/{game_id}/{number}/{timeout_called}", submit_defensive_number,
+             "game_plays/defense_submitted"),
+            ("PUT", "/game_plays/offense_submitted/{play_id}/{number}/{play}/{runoff_type}/{offensive_timeout}/"
+                    "{defensive_timeout}", submit_offensive_number, "game_plays/offense_submitted"),
+            ("GET", "/users/team/{team}", get_user_by_team, "users/team")):
+        route_names[app.router.add_route(method, path, handler)] = route
+    app.router.add_get("/_simulator/stats", get_stats)
+    app.router.add_put("/_simulator/faults", update_faults)
+    app.router.add_post("/_simulator/reset", reset)
+    return app
+
+
+async def start_simulator(simulator, faults, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Serve the simulator on the running event loop, so a benchmark can run it alongside the bot's client
+
+    :param simulator:
+    :param faults:
+    :param host:
+    :param port:
+    :return: The server's runner, to clean up when done.
+    """
+
+    runner = web.AppRunner(create_app(simulator, faults), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("SUCCESS: Simulating Zebstrika on http://%s:%s/", host, port)
+    return runner
+
+
+def parse_route_latency(spec):
+    route, _, latency = spec.partition("=")
+    LatencyDistribution(latency)
+    return route, latency
+
+
+async def serve(arguments):
+    simulator = GameSimulator(random.Random(arguments.seed))
+    if arguments.users:
+        with open(arguments.users, 'r') as users_file:
+            simulator.load_users(json.load(users_file))
+    faults = FaultProfile(arguments.latency, dict(arguments.route_latency), arguments.error_rate,
+                          arguments.error_statuses, arguments.slow_rate, arguments.slow_latency,
+                          arguments.brownout_every, arguments.brownout_for, arguments.brownout_factor)
+    runner = await start_simulator(simulator, faults, arguments.host, arguments.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a simulated Zebstrika API with in-memory games")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, help="seed for coin tosses and injected faults")
+    parser.add_argument("--users", help="JSON list of coaches with username, discordTag and team")
+    parser.add_argument("--latency", default="fixed:0", type=lambda spec: str(LatencyDistribution(spec)),
+                        help="delay before every response")
+    parser.add_argument("--route-latency", action="append", default=[], type=parse_route_latency,
+                        metavar="ROUTE=LATENCY", help="delay for one route instead of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument("--error-statuses", type=lambda statuses: [int(status) for status in statuses.split(",")],
+                        default=list(DEFAULT_ERROR_STATUSES), help="comma separated statuses to answer errors with")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of requests answered after --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=30.0, help="seconds before a slow response")
+    parser.add_argument("--brownout-every", type=float, default=0.0, help="seconds between the starts of brownouts")
+    parser.add_argument("--brownout-for", type=float, default=0.0, help="seconds each brownout lasts")
+    parser.add_argument("--brownout-factor", type=float, default=10.0, help="latency multiplier during a brownout")
+    arguments = parser.parse_args()
+
+    configure_logging({})
+    try:
+        asyncio.run(serve(arguments))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import time
+from collections import OrderedDict
+
+DEFAULT_GAME_CACHE_SIZE = 256
+DEFAULT_GAME_CACHE_TTL = 5
+DEFAULT_USER_CACHE_SIZE = 512
+DEFAULT_USER_CACHE_TTL = 21600
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a fixed time to live
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        self._entries.clear()
+
+    def configure(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class GameCache:
+    """
+    Cache of ongoing game objects, reachable by game ID and by Discord thread ID
+    """
+
+    def __init__(self, maxsize=DEFAULT_GAME_CACHE_SIZE, ttl=DEFAULT_GAME_CACHE_TTL):
+        self._games = TTLCache(maxsize, ttl)
+        self._threads = TTLCache(maxsize, ttl)
+        # Every write gets the next sequence number, and each game remembers the number of its last write
+        self._sequence = 0
+        self._game_writes = OrderedDict()
+        # Games whose last write was forgotten are treated as written at this sequence number
+        self._forgotten_writes = 0
+        # Thread to game ID mapping that outlives the cached games, so thread reads can find their game's writes
+        self._thread_games = OrderedDict()
+
+    def get_by_game_id(self, game_id):
+        return self._games.get(str(game_id))
+
+    def get_by_thread_id(self, thread_id):
+        game_id = self._threads.get(str(thread_id))
+        if game_id is None:
+            self._games.misses += 1
+            return None
+        return self._games.get(game_id)
+
+    def write_marker(self):
+        """
+        Marker taken before a read, so a read that raced a write to the same game does not fill the cache with stale
+        data
+
+        :return:
+        """
+
+        return self._sequence
+
+    def write_version(self, game_id=None, thread_id=None):
+        """
+        Get the sequence number of the last write to a game, found by game ID or by Discord thread ID
+
+        Changes whenever the game is written, so reads started before the write can be told apart from reads started
+        after it. A thread whose game is not known changes with every write
+
+        :param game_id:
+        :param thread_id:
+        :return:
+        """
+
+        if game_id is None:
+            game_id = self._thread_games.get(str(thread_id))
+            if game_id is None:
+                return self._sequence
+        return self._game_writes.get(str(game_id), self._forgotten_writes)
+
+    def put(self, game_object, marker=None):
+        if game_object is None:
+            return
+
+        game_id = str(game_object["gameId"])
+        if marker is not None and self.write_version(game_id) > marker:
+            return
+
+        self._games.set(game_id, game_object)
+        for platform, platform_id in (("homePlatform", "homePlatformId"), ("awayPlatform", "awayPlatformId")):
+            if game_object.get(platform) == "Discord" and game_object.get(platform_id) is not None:
+                thread_id = str(game_object[platform_id])
+                self._threads.set(thread_id, game_id)
+                self._remember(self._thread_games, thread_id, game_id)
+
+    def invalidate(self, game_id):
+        game_id = str(game_id)
+        self._sequence += 1
+        self._remember(self._game_writes, game_id, self._sequence)
+        self._games.pop(game_id)
+
+    def _remember(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self._games.maxsize:
+            _, forgotten = entries.popitem(last=False)
+            if entries is self._game_writes:
+                self._forgotten_writes = forgotten
+
+    def configure(self, maxsize, ttl):
+        self._games.configure(maxsize, ttl)
+        self._threads.configure(maxsize, ttl)
+
+    def clear(self):
+        self._sequence += 1
+        self._forgotten_writes = self._sequence
+        self._game_writes.clear()
+        self._thread_games.clear()
+        self._games.clear()
+        self._threads.clear()
+
+    @property
+    def hits(self):
+        return self._games.hits
+
+    @property
+    def misses(self):
+        return self._games.misses
+
+
+game_cache = GameCache()
+user_cache = TTLCache(DEFAULT_USER_CACHE_SIZE, DEFAULT_USER_CACHE_TTL)
+
+
+def configure_caches(config_data):
+    """
+    Size the shared Zebstrika caches from the api section of the config
+
+    :param config_data:
+    :return:
+    """
+
+    api_config = config_data['api']
+    game_cache.configure(api_config.get('game_cache_size', DEFAULT_GAME_CACHE_SIZE),
+                         api_config.get('game_cache_ttl', DEFAULT_GAME_CACHE_TTL))
+    user_cache.configure(api_config.get('user_cache_size', DEFAULT_USER_CACHE_SIZE),
+                         api_config.get('user_cache_ttl', DEFAULT_USER_CACHE_TTL))
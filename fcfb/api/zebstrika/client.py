@@ -0,0 +1,290 @@
+import asyncio
+import json
+import random
+import time
+import logging
+import aiohttp
+
+from fcfb.main.exceptions import ZebstrikaClientError, ZebstrikaUnavailableError
+from fcfb.main.capture import event_recorder
+from fcfb.main.metrics import zebstrika_requests, zebstrika_request_seconds
+
+DEFAULT_POOL_SIZE = 100
+DEFAULT_POOL_SIZE_PER_HOST = 30
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.2
+MAX_RETRY_BACKOFF = 2
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 30
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PUT"}
+
+logger = logging.getLogger(__name__)
+
+# Shared session, opened once per process in run_hypnotoad
+_session = None
+_settings = {}
+
+
+class CircuitBreaker:
+    """
+    Fail fast while Zebstrika is unhealthy instead of piling up requests that will time out
+
+    Opens after a run of consecutive failures, then lets a single trial request through once the recovery
+    timeout has passed
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, recovery_timeout=DEFAULT_RECOVERY_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def before_request(self):
+        if self.opened_at is None:
+            return
+        if time.monotonic() - self.opened_at < self.recovery_timeout or self._trial_in_flight:
+            raise ZebstrikaUnavailableError("Zebstrika is not responding right now, please try again in a minute")
+        self._trial_in_flight = True
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("SUCCESS: Zebstrika has recovered, closing the circuit breaker")
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.error("Zebstrika failed %s times in a row, opening the circuit breaker", self.failures)
+            self.opened_at = time.monotonic()
+
+
+circuit_breaker = CircuitBreaker()
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent reads, so callers share one outstanding request and its result
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+
+    async def do(self, key, request):
+        """
+        Run the request, or join the one already running for the same key
+
+        :param key:
+        :param request: Coroutine function making the request.
+        :return:
+        """
+
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(request())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done_task: self._finish(key, done_task))
+        else:
+            self.coalesced += 1
+
+        # Shield the shared request so one caller being cancelled does not cancel it for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the error as retrieved in case every caller was cancelled
+            task.exception()
+
+    def __len__(self):
+        return len(self._in_flight)
+
+
+single_flight = SingleFlight()
+
+
+class ZebstrikaResponse:
+    """
+    Fully read response from Zebstrika, so callers do not need to hold the connection open
+    """
+
+    __slots__ = ("status_code", "text")
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text) if self.text else None
+
+
+async def open_zebstrika_session(config_data):
+    """
+    Open the shared, pooled HTTP session used by every Zebstrika API call
+
+    :param config_data:
+    :return:
+    """
+
+    global _session, _settings
+
+    if _session is not None and not _session.closed:
+        return _session
+
+    api_config = config_data['api']
+    _settings = {
+        'timeouts': api_config.get('timeouts', {}),
+        'retries': api_config.get('retries', DEFAULT_RETRIES),
+        'retry_backoff': api_config.get('retry_backoff', DEFAULT_RETRY_BACKOFF)
+    }
+    circuit_breaker.failure_threshold = api_config.get('failure_threshold', DEFAULT_FAILURE_THRESHOLD)
+    circuit_breaker.recovery_timeout = api_config.get('recovery_timeout', DEFAULT_RECOVERY_TIMEOUT)
+    connector = aiohttp.TCPConnector(
+        limit=api_config.get('pool_size', DEFAULT_POOL_SIZE),
+        limit_per_host=api_config.get('pool_size_per_host', DEFAULT_POOL_SIZE_PER_HOST),
+        keepalive_timeout=api_config.get('keepalive_timeout', DEFAULT_KEEPALIVE_TIMEOUT))
+    _session = aiohttp.ClientSession(connector=connector)
+    logger.info("Opened the Zebstrika session")
+    return _session
+
+
+async def close_zebstrika_session():
+    """
+    Close the shared Zebstrika session and release its pooled connections
+
+    :return:
+    """
+
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("Closed the Zebstrika session")
+    _session = None
+
+
+def get_zebstrika_session():
+    """
+    Get the shared Zebstrika session
+
+    :return:
+    """
+
+    if _session is None or _session.closed:
+        raise ZebstrikaClientError("The Zebstrika session has not been opened")
+    return _session
+
+
+def get_timeout(route):
+    """
+    Get the deadline in seconds for a route, from api.timeouts in the config
+
+    :param route:
+    :return:
+    """
+
+    timeouts = _settings.get('timeouts', {})
+    return timeouts.get(route, timeouts.get('default', DEFAULT_TIMEOUT))
+
+
+async def zebstrika_request(method, endpoint, route, retry=None, write_version=None):
+    """
+    Make a request to Zebstrika on the shared session and read the full response
+
+    Every attempt has a deadline. Idempotent requests are retried with jittered backoff on timeouts, connection
+    errors and retryable statuses, and every request is refused while the circuit breaker is open. Concurrent GETs
+    for the same endpoint and write version share one request
+
+    :param method:
+    :param endpoint:
+    :param route: Route name used to look up the timeout, e.g. "games/ongoing/discord".
+    :param retry: Whether the request may be retried, defaults to True for GET and PUT.
+    :param write_version: Version of the data a GET reads, so a read issued after a write does not join an older one.
+    :return:
+    """
+
+    if method == "GET":
+        flight_key = endpoint if write_version is None else (endpoint, write_version)
+        return await single_flight.do(flight_key, lambda: send_request(method, endpoint, route, retry))
+    return await send_request(method, endpoint, route, retry)
+
+
+async def send_request(method, endpoint, route, retry):
+    """
+    Send the request with its deadline, retries and circuit breaker
+
+    :param method:
+    :param endpoint:
+    :param route:
+    :param retry:
+    :return:
+    """
+
+    started_at = time.perf_counter()
+    try:
+        return await send_attempts(method, endpoint, route, retry)
+    finally:
+        zebstrika_request_seconds.observe(time.perf_counter() - started_at, route)
+
+
+async def send_attempts(method, endpoint, route, retry):
+    session = get_zebstrika_session()
+    retry = method in IDEMPOTENT_METHODS if retry is None else retry
+    attempts = 1 + (_settings.get('retries', DEFAULT_RETRIES) if retry else 0)
+    timeout = aiohttp.ClientTimeout(total=get_timeout(route))
+
+    for attempt in range(attempts):
+        try:
+            circuit_breaker.before_request()
+        except ZebstrikaUnavailableError:
+            zebstrika_requests.inc(route, method, "circuit_open")
+            raise
+        try:
+            async with session.request(method, endpoint, timeout=timeout) as response:
+                text = await response.text()
+                zebstrika_response = ZebstrikaResponse(response.status, text)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            zebstrika_requests.inc(route, method, e.__class__.__name__)
+            circuit_breaker.record_failure()
+            error = ZebstrikaClientError(f"{method} {route} failed, {e.__class__.__name__} {e}")
+        else:
+            zebstrika_requests.inc(route, method, str(zebstrika_response.status_code))
+            if zebstrika_response.status_code < 500:
+                circuit_breaker.record_success()
+            else:
+                circuit_breaker.record_failure()
+            if event_recorder.enabled:
+                await event_recorder.record_zebstrika(method, endpoint, zebstrika_response.status_code, text)
+            if zebstrika_response.status_code not in RETRYABLE_STATUS_CODES:
+                return zebstrika_response
+            error = None
+        finally:
+            # A trial that ended in any other way, e.g. cancelled or failing to decode, must not hold the breaker open
+            circuit_breaker.release_trial()
+
+        if attempt == attempts - 1 or circuit_breaker.is_open:
+            if error is not None:
+                raise error
+            return zebstrika_response
+
+        backoff = min(MAX_RETRY_BACKOFF, _settings.get('retry_backoff', DEFAULT_RETRY_BACKOFF) * 2 ** attempt)
+        logger.info("INFO: Retrying %s %s after attempt %s of %s", method, route, attempt + 1, attempts)
+        await asyncio.sleep(random.uniform(0, backoff))
@@ -1,22 +1,12 @@
-import requests
-import sys
 import logging
 
+from fcfb.api.zebstrika.cache import game_cache
+from fcfb.api.zebstrika.client import zebstrika_request
 from fcfb.main.exceptions import async_exception_handler, ZebstrikaGamePlaysAPIError
 
 GAME_PLAYS_PATH = "game_plays/"
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
-
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+logger = logging.getLogger(__name__)
 
 
 @async_exception_handler()
@@ -30,19 +20,19 @@ async def submit_defensive_number(config_data, game_id, defensive_number, timeou
     :return:
     """
 
+    payload = f"defense_submitted/{game_id}/{defensive_number}/{timeout_called}"
+    endpoint = config_data['api']['url'] + GAME_PLAYS_PATH + payload
     try:
-        payload = f"defense_submitted/{game_id}/{defensive_number}/{timeout_called}"
-        endpoint = config_data['api']['url'] + GAME_PLAYS_PATH + payload
-        response = requests.post(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Submitted defensive number for game {game_id}")
-            return response.status_code
-        else:
-            raise ZebstrikaGamePlaysAPIError(f"HTTP {response.status_code} response {response.text}")
+        response = await zebstrika_request("POST", endpoint, "game_plays/defense_submitted")
+    finally:
+        # A write that failed or timed out may still have been applied
+        game_cache.invalidate(game_id)
 
-    except Exception as e:
-        raise Exception(f"{e}")
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Submitted defensive number for game %s", game_id)
+        return response.status_code
+    else:
+        raise ZebstrikaGamePlaysAPIError(f"HTTP {response.status_code} response {response.text}")
 
 
 @async_exception_handler()
@@ -62,19 +52,18 @@ async def submit_offensive_number(config_data, game_id, play_id, offensive_numbe
     :return:
     """
 
+    offensive_timeout_called_str = str(offensive_timeout_called).lower()
+    defensive_timeout_called_str = str(defensive_timeout_called).lower()
+    payload = f"offense_submitted/{play_id}/{offensive_number}/{play}/{runoff_type}" \
+              f"/{offensive_timeout_called_str}/{defensive_timeout_called_str}"
+    endpoint = config_data['api']['url'] + GAME_PLAYS_PATH + payload
     try:
-        offensive_timeout_called_str = str(offensive_timeout_called).lower()
-        defensive_timeout_called_str = str(defensive_timeout_called).lower()
-        payload = f"offense_submitted/{play_id}/{offensive_number}/{play}/{runoff_type}" \
-                  f"/{offensive_timeout_called_str}/{defensive_timeout_called_str}"
-        endpoint = config_data['api']['url'] + GAME_PLAYS_PATH + payload
-        response = requests.put(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Play was run successfully {game_id}")
-            return response.json()
-        else:
-            raise ZebstrikaGamePlaysAPIError(f"HTTP {response.status_code} response {response.text}")
+        response = await zebstrika_request("PUT", endpoint, "game_plays/offense_submitted", retry=False)
+    finally:
+        game_cache.invalidate(game_id)
 
-    except Exception as e:
-        raise Exception(f"{e}")
\ No newline at end of file
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Play was run successfully %s", game_id)
+        return response.json()
+    else:
+        raise ZebstrikaGamePlaysAPIError(f"HTTP {response.status_code} response {response.text}")
\ No newline at end of file
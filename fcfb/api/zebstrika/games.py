@@ -1,22 +1,12 @@
-import requests
-import sys
 import logging
 
+from fcfb.api.zebstrika.cache import game_cache
+from fcfb.api.zebstrika.client import zebstrika_request
 from fcfb.main.exceptions import async_exception_handler, ZebstrikaGamesAPIError
 
 GAMES_PATH = "games/"
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
-
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+logger = logging.getLogger(__name__)
 
 
 @async_exception_handler()
@@ -28,22 +18,26 @@ async def get_ongoing_game_by_thread_id(config_data, thread_id):
     :return:
     """
 
-    try:
-        payload = f"ongoing/discord/{thread_id}"
-        endpoint = config_data['api']['url'] + GAMES_PATH + payload
-        response = requests.get(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Grabbed the ongoing game for {thread_id}")
-            return response.json()
-        elif response.status_code == 404:
-            logger.info(f"SUCCESS: No ongoing game for {thread_id}")
-            return None
-        else:
-            raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
-
-    except Exception as e:
-        raise Exception(f"{e}")
+    game_object = game_cache.get_by_thread_id(thread_id)
+    if game_object is not None:
+        return game_object
+
+    marker = game_cache.write_marker()
+    payload = f"ongoing/discord/{thread_id}"
+    endpoint = config_data['api']['url'] + GAMES_PATH + payload
+    response = await zebstrika_request("GET", endpoint, "games/ongoing/discord",
+                                       write_version=game_cache.write_version(thread_id=thread_id))
+
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Grabbed the ongoing game for %s", thread_id)
+        game_object = response.json()
+        game_cache.put(game_object, marker)
+        return game_object
+    elif response.status_code == 404:
+        logger.info("SUCCESS: No ongoing game for %s", thread_id)
+        return None
+    else:
+        raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
 
 
 @async_exception_handler()
@@ -55,22 +49,26 @@ async def get_ongoing_game_by_id(config_data, game_id):
     :return:
     """
 
-    try:
-        payload = f"game_id/{game_id}"
-        endpoint = config_data['api']['url'] + GAMES_PATH + payload
-        response = requests.get(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Grabbed the ongoing game for game id {game_id}")
-            return response.json()
-        elif response.status_code == 404:
-            logger.info(f"SUCCESS: No ongoing game for game id {game_id}")
-        else:
-            raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
-        return None
+    game_object = game_cache.get_by_game_id(game_id)
+    if game_object is not None:
+        return game_object
 
-    except Exception as e:
-        raise Exception(f"{e}")
+    marker = game_cache.write_marker()
+    payload = f"game_id/{game_id}"
+    endpoint = config_data['api']['url'] + GAMES_PATH + payload
+    response = await zebstrika_request("GET", endpoint, "games/game_id",
+                                       write_version=game_cache.write_version(game_id=game_id))
+
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Grabbed the ongoing game for game id %s", game_id)
+        game_object = response.json()
+        game_cache.put(game_object, marker)
+        return game_object
+    elif response.status_code == 404:
+        logger.info("SUCCESS: No ongoing game for game id %s", game_id)
+    else:
+        raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
+    return None
 
 
 @async_exception_handler()
@@ -93,21 +91,17 @@ async def post_game(config_data, channel_id, season, week, subdivision, home_tea
     :return:
     """
 
-    try:
-
-        payload = f"start/Discord/{channel_id}/Discord/{channel_id}/{season}/{week}/{subdivision}/{home_team}/" \
-                  f"{away_team}/{tv_channel}/{start_time}/{location}/{is_scrimmage}"
-        endpoint = config_data['api']['url'] + GAMES_PATH + payload
-        response = requests.post(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Successfully started a game at {channel_id}. {home_team} vs {away_team} in S{season} {subdivision}")
-            return response.status_code
-        else:
-            raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
+    payload = f"start/Discord/{channel_id}/Discord/{channel_id}/{season}/{week}/{subdivision}/{home_team}/" \
+              f"{away_team}/{tv_channel}/{start_time}/{location}/{is_scrimmage}"
+    endpoint = config_data['api']['url'] + GAMES_PATH + payload
+    response = await zebstrika_request("POST", endpoint, "games/start")
 
-    except Exception as e:
-        raise Exception(f"{e}")
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Successfully started a game at %s. %s vs %s in S%s %s", channel_id, home_team,
+                    away_team, season, subdivision)
+        return response.status_code
+    else:
+        raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
 
 
 @async_exception_handler()
@@ -121,19 +115,21 @@ async def run_coin_toss(config_data, game_id, coin_toss_choice):
     :return:
     """
 
+    payload = f"coin_toss/{game_id}/{coin_toss_choice}"
+    endpoint = config_data['api']['url'] + GAMES_PATH + payload
     try:
-        payload = f"coin_toss/{game_id}/{coin_toss_choice}"
-        endpoint = config_data['api']['url'] + GAMES_PATH + payload
-        response = requests.put(endpoint)
+        response = await zebstrika_request("PUT", endpoint, "games/coin_toss", retry=False)
+    finally:
+        # A write that failed or timed out may still have been applied
+        game_cache.invalidate(game_id)
 
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Successfully ran the coin toss for {game_id}")
-            return response.json()
-        else:
-            raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
-
-    except Exception as e:
-        raise Exception(f"{e}")
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Successfully ran the coin toss for %s", game_id)
+        game_object = response.json()
+        game_cache.put(game_object)
+        return game_object
+    else:
+        raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
 
 
 @async_exception_handler()
@@ -147,19 +143,20 @@ async def update_coin_toss_choice(config_data, game_id, coin_toss_choice):
     :return:
     """
 
+    payload = f"coin_toss_choice/{game_id}/{coin_toss_choice}"
+    endpoint = config_data['api']['url'] + GAMES_PATH + payload
     try:
-        payload = f"coin_toss_choice/{game_id}/{coin_toss_choice}"
-        endpoint = config_data['api']['url'] + GAMES_PATH + payload
-        response = requests.put(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Updated the coin toss choice for {game_id} to {coin_toss_choice}")
-            return response.json()
-        else:
-            raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
+        response = await zebstrika_request("PUT", endpoint, "games/coin_toss_choice")
+    finally:
+        game_cache.invalidate(game_id)
 
-    except Exception as e:
-        raise Exception(f"{e}")
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Updated the coin toss choice for %s to %s", game_id, coin_toss_choice)
+        game_object = response.json()
+        game_cache.put(game_object)
+        return game_object
+    else:
+        raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
 
 
 @async_exception_handler()
@@ -173,19 +170,18 @@ async def update_waiting_on(config_data, game_id, username):
     :return:
     """
 
+    payload = f"waiting_on/{game_id}/{username}"
+    endpoint = config_data['api']['url'] + GAMES_PATH + payload
     try:
-        payload = f"waiting_on/{game_id}/{username}"
-        endpoint = config_data['api']['url'] + GAMES_PATH + payload
-        response = requests.put(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Updated the team the game is waiting on for game {game_id} to {username}")
-            return username
-        else:
-            raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
+        response = await zebstrika_request("PUT", endpoint, "games/waiting_on")
+    finally:
+        game_cache.invalidate(game_id)
 
-    except Exception as e:
-        raise Exception(f"{e}")
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Updated the team the game is waiting on for game %s to %s", game_id, username)
+        return username
+    else:
+        raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
 
 
 @async_exception_handler()
@@ -199,16 +195,15 @@ async def delete_ongoing_game(config_data, game_id):
     :return:
     """
 
+    payload = f"{game_id}"
+    endpoint = config_data['api']['url'] + GAMES_PATH + payload
     try:
-        payload = f"{game_id}"
-        endpoint = config_data['api']['url'] + GAMES_PATH + payload
-        response = requests.delete(endpoint)
-
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Delete game {game_id}")
-            return response.status_code
-        else:
-            raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
-
-    except Exception as e:
-        raise Exception(f"{e}")
\ No newline at end of file
+        response = await zebstrika_request("DELETE", endpoint, "games/delete")
+    finally:
+        game_cache.invalidate(game_id)
+
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Delete game %s", game_id)
+        return response.status_code
+    else:
+        raise ZebstrikaGamesAPIError(f"HTTP {response.status_code} response {response.text}")
\ No newline at end of file
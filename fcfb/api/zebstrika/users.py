@@ -1,22 +1,14 @@
-import requests
-import sys
+import asyncio
 import logging
 
+from fcfb.api.zebstrika.cache import user_cache
+from fcfb.api.zebstrika.client import zebstrika_request
 from fcfb.main.exceptions import async_exception_handler, ZebstrikaUsersAPIError
 
 USERS_PATH = "users/"
+DEFAULT_WARM_CONCURRENCY = 5
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
-
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+logger = logging.getLogger(__name__)
 
 
 @async_exception_handler()
@@ -29,15 +21,59 @@ async def get_user_by_team(config_data, team):
     :return:
     """
 
-    try:
-        endpoint = config_data['api']['url'] + USERS_PATH + "team/" + team
-        response = requests.get(endpoint)
+    user_object = user_cache.get(team)
+    if user_object is not None:
+        return user_object
+
+    endpoint = config_data['api']['url'] + USERS_PATH + "team/" + team
+    response = await zebstrika_request("GET", endpoint, "users/team")
+
+    if response.status_code == 200 or response.status_code == 201:
+        logger.info("SUCCESS: Successfully grabbed a user object for %s", team)
+        user_object = response.json()
+        user_cache.set(team, user_object)
+        return user_object
+    else:
+        raise ZebstrikaUsersAPIError(f"HTTP {response.status_code} response {response.text}")
+
+
+def invalidate_user_cache(team=None):
+    """
+    Drop one team's coach, or every coach, from the user cache
+
+    :param team:
+    :return:
+    """
+
+    if team is None:
+        user_cache.clear()
+        logger.info("SUCCESS: Cleared the user cache")
+    else:
+        user_cache.pop(team)
+        logger.info("SUCCESS: Cleared the user cache for %s", team)
+
+
+async def warm_user_cache(config_data, game_objects):
+    """
+    Load the coaches for every team in the given games into the user cache
+
+    Zebstrika only looks users up one team at a time, so this makes one request per team, at most
+    api.user_warm_concurrency at once so startup does not flood Zebstrika
+
+    :param config_data:
+    :param game_objects:
+    :return:
+    """
+
+    teams = list({game_object[side] for game_object in game_objects for side in ("homeTeam", "awayTeam")})
+    semaphore = asyncio.Semaphore(config_data['api'].get('user_warm_concurrency', DEFAULT_WARM_CONCURRENCY))
 
-        if response.status_code == 200 or response.status_code == 201:
-            logger.info(f"SUCCESS: Successfully grabbed a user object for {team}")
-            return response.json()
-        else:
-            raise ZebstrikaUsersAPIError(f"HTTP {response.status_code} response {response.text}")
+    async def warm(team):
+        async with semaphore:
+            return await get_user_by_team(config_data, team)
 
-    except Exception as e:
-        raise Exception(f"{e}")
+    results = await asyncio.gather(*(warm(team) for team in teams), return_exceptions=True)
+    failed = [team for team, result in zip(teams, results) if isinstance(result, Exception)]
+    if failed:
+        logger.error("Could not warm the user cache for %s", ', '.join(failed))
+    logger.info("SUCCESS: Warmed the user cache with %s coaches", len(teams) - len(failed))
@@ -3,31 +3,29 @@ import discord
 import logging
 
 from fcfb.discord.game import start_game, delete_game, validate_and_submit_defensive_number, \
-    message_defense_for_number, get_user_objects, validate_and_submit_offensive_number
-from fcfb.discord.utils import create_message, get_discord_user_by_name
-from fcfb.api.zebstrika.games import get_ongoing_game_by_thread_id, run_coin_toss, update_coin_toss_choice, \
-    update_waiting_on
-from fcfb.api.zebstrika.users import get_user_by_team
+    message_defense_for_number, get_user_objects, validate_and_submit_offensive_number, start_games
+from fcfb.discord.slate import parse_slate, summarize_slate, DEFAULT_BULK_START_CONCURRENCY
+from fcfb.discord.utils import create_message, send_direct_message, get_discord_user_by_name, MAX_MESSAGE_LENGTH
+from fcfb.discord.scheduler import PRIORITY_RESULT
+from fcfb.api.zebstrika.games import run_coin_toss, update_coin_toss_choice, update_waiting_on
+from fcfb.api.zebstrika.users import invalidate_user_cache
+from fcfb.discord.thread_index import game_thread_index
+from fcfb.discord.game_store import game_store
+from fcfb.main.concurrency import gather_all
+from fcfb.main.tracing import tracer, format_trace
 from fcfb.main.exceptions import async_exception_handler, GameError, InvalidParameterError
 from fcfb.discord.game import validate_waiting_on
 
 sys.path.append("..")
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
+DEFAULT_SLOWEST_TRACES = 5
+MAX_SLOWEST_TRACES = 10
 
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+logger = logging.getLogger(__name__)
 
 
 @async_exception_handler()
-async def parse_game_thread_commands(client, config_data, discord_messages, message):
+async def parse_game_thread_commands(client, config_data, discord_messages, message, context):
     """
     Handle commands from Discord users in a game thread.
 
@@ -35,32 +33,40 @@ async def parse_game_thread_commands(client, config_data, discord_messages, mess
     :param config_data:
     :param discord_messages:
     :param message:
+    :param context:
     :return:
     """
 
-    game_object = await get_ongoing_game_by_thread_id(config_data, message.channel.id)
-    home_user_object, away_user_object = await get_user_objects(config_data, game_object)
-
     message_content_lower = message.content.lower()
     message_content = message.content
 
     try:
+        game_object = await context.get_game()
+        if game_object is None:
+            # The game in this thread has ended since it was indexed
+            game_thread_index.add_non_game_thread(message.channel.id)
+            await game_store.forget_thread(message.channel.id)
+            return
+        home_user_object, away_user_object = await get_user_objects(context, game_object)
+
         validate_waiting_on(message, game_object, home_user_object, away_user_object)
         if ("heads" in message_content or "tails" in message_content) and game_object["coinTossWinner"] == "None":
-            await coin_toss_command(client, config_data, game_object, discord_messages, message_content_lower, message)
+            await coin_toss_command(client, config_data, game_object, discord_messages, message_content_lower, message,
+                                    context)
         elif ("receive" in message_content or "defer" in message_content) and \
              (game_object["coinTossWinner"] != "None" and game_object["coinTossChoice"] == "None"):
-            await coin_toss_choice_command(client, config_data, discord_messages, message_content_lower, message)
+            await coin_toss_choice_command(client, config_data, discord_messages, message_content_lower, message,
+                                           context)
         else:
-            await validate_and_submit_offensive_number(client, config_data, discord_messages, message)
+            await validate_and_submit_offensive_number(client, config_data, discord_messages, message, context)
 
     except Exception as e:
         await create_message(message.channel, f"ERROR: {e}")
-        raise Exception(e)
+        raise
 
 
 @async_exception_handler()
-async def parse_commands(client, config_data, discord_messages, prefix, message):
+async def parse_commands(client, config_data, discord_messages, prefix, message, context):
     """
     Handle commands from Discord users.
 
@@ -69,6 +75,7 @@ async def parse_commands(client, config_data, discord_messages, prefix, message)
     :param discord_messages: Discord messages.
     :param prefix: Command prefix.
     :param message: Discord message object.
+    :param context: Message context.
     :return: None
     """
 
@@ -80,6 +87,9 @@ async def parse_commands(client, config_data, discord_messages, prefix, message)
             await display_help_command(message.channel, prefix)
 
         # TODO make sure only admins can do certain commands
+        elif message_content_lower.startswith(prefix + 'bulkstart'):
+            await bulk_start_command(client, config_data, discord_messages, message)
+
         elif message_content_lower.startswith(prefix + 'start'):
             command = message_content.split('start')[1].strip()
             await start_game_command(client, config_data, discord_messages, command, message)
@@ -89,15 +99,23 @@ async def parse_commands(client, config_data, discord_messages, prefix, message)
 
         elif message_content_lower.startswith(prefix + 'choice'):
             coin_toss_choice = message_content.split('choice')[1].strip()
-            await coin_toss_choice_command(client, config_data, discord_messages, coin_toss_choice, message)
+            await coin_toss_choice_command(client, config_data, discord_messages, coin_toss_choice, message, context)
+
+        elif message_content_lower.startswith(prefix + 'clearcache'):
+            team = message_content[len(prefix + 'clearcache'):].strip()
+            await clear_user_cache_command(message, team)
+
+        elif message_content_lower.startswith(prefix + 'slowest'):
+            count = message_content[len(prefix + 'slowest'):].strip()
+            await slowest_traces_command(message, count)
 
     except Exception as e:
         await create_message(message.channel, f"ERROR: {e}")
-        raise Exception(e)
+        raise
 
 
 @async_exception_handler()
-async def parse_direct_message_number_submission(client, config_data, discord_messages, message):
+async def parse_direct_message_number_submission(client, config_data, discord_messages, message, context):
     """
     Handle direct messages from Discord users.
 
@@ -105,10 +123,15 @@ async def parse_direct_message_number_submission(client, config_data, discord_me
     :param config_data: Configuration data.
     :param discord_messages: Discord messages.
     :param message: Discord message object.
+    :param context: Message context.
     :return: None
     """
 
-    await validate_and_submit_defensive_number(client, config_data, discord_messages, message)
+    try:
+        await validate_and_submit_defensive_number(client, config_data, discord_messages, message, context)
+    except Exception as e:
+        await send_direct_message(message.author, f"ERROR: {e}")
+        raise
 
 
 @async_exception_handler()
@@ -121,10 +144,14 @@ async def display_help_command(channel, prefix):
     :return: None
     """
 
-    command_list = "start\n"
+    command_list = "start\nbulkstart\nclearcache\nslowest\n"
     parameters_list = "[season, week, subdivision, home team, away team, tv channel, start time, location, " \
-                      "is scrimmage?]\n"
-    example_list = prefix + "start 9, 1, FBS, Ohio State, Michigan, ABC, 12:00 PM, War Memorial Stadium, yes]\n"
+                      "is scrimmage?]\nattached CSV or JSON schedule, one game per row\n[team (optional)]\n" \
+                      "[number of traces (optional)]\n"
+    example_list = prefix + "start 9, 1, FBS, Ohio State, Michigan, ABC, 12:00 PM, War Memorial Stadium, yes]\n" + \
+        prefix + "bulkstart with week1.csv attached\n" + \
+        prefix + "clearcache Ohio State\n" + \
+        prefix + "slowest 5\n"
 
     embed = discord.Embed(
         title="Hypnotoad Commands",
@@ -150,23 +177,46 @@ async def start_game_command(client, config_data, discord_messages, command, mes
     :return: None
     """
 
-    try:
-        game_parameters = command.split('[')[1].split(']')[0].split(',')
-        if len(game_parameters) != 9:
-            raise InvalidParameterError(f"Expected 9 parameters but was {len(game_parameters)}.")
+    game_parameters = command.split('[')[1].split(']')[0].split(',')
+    if len(game_parameters) != 9:
+        raise InvalidParameterError(f"Expected 9 parameters but was {len(game_parameters)}.")
 
-        logger.info("Starting game with parameters: " + str(game_parameters))
-        await start_game(client, config_data, discord_messages, game_parameters)
-        success_message = f"SUCCESS: Game started with parameters: {game_parameters} in channel: {message.channel.id}"
-        logger.info(success_message)
-        await create_message(message.channel, success_message)
+    logger.info("Starting game with parameters: %s", game_parameters)
+    await start_game(client, config_data, discord_messages, game_parameters)
+    success_message = f"SUCCESS: Game started with parameters: {game_parameters} in channel: {message.channel.id}"
+    logger.info("%s", success_message)
+    await create_message(message.channel, success_message)
 
-    except Exception as e:
-        raise Exception(e)
+
+@async_exception_handler()
+async def bulk_start_command(client, config_data, discord_messages, message):
+    """
+    Handle command to start a slate of games from an attached schedule.
+
+    :param client: Discord client.
+    :param config_data: Configuration data.
+    :param discord_messages: Discord messages.
+    :param message: Discord message object.
+    :return: None
+    """
+
+    validate_admin(message)
+    if not message.attachments:
+        raise InvalidParameterError("Attach a CSV or JSON schedule to start a slate of games")
+
+    attachment = message.attachments[0]
+    slate = parse_slate(attachment.filename, await attachment.read())
+
+    logger.info("Starting a slate of %s games", len(slate))
+    concurrency = config_data['parameters'].get('bulk_start_concurrency', DEFAULT_BULK_START_CONCURRENCY)
+    errors = await start_games(client, config_data, discord_messages, slate, concurrency)
+    summary = summarize_slate(slate, errors)
+    logger.info("%s", summary)
+    await create_message(message.channel, summary)
 
 
 @async_exception_handler()
-async def coin_toss_command(client, config_data, game_object, discord_messages, coin_toss_call, message):
+async def coin_toss_command(client, config_data, game_object, discord_messages, coin_toss_call, message, context):
     """
     Handle command to call a coin toss.
 
@@ -176,41 +226,40 @@ async def coin_toss_command(client, config_data, game_object, discord_messages,
     :param discord_messages: Discord messages.
     :param coin_toss_call: The coin toss call, heads or tails.
     :param message: Discord message object.
+    :param context: Message context.
     :return: None
     """
 
-    try:
-        game_id = game_object["gameId"]
+    game_id = game_object["gameId"]
 
-        # Get coin toss choice
-        if coin_toss_call not in ['heads', 'tails']:
-            raise GameError("Invalid coin toss call, options are **heads** or **tails**")
+    # Get coin toss choice
+    if coin_toss_call not in ['heads', 'tails']:
+        raise GameError("Invalid coin toss call, options are **heads** or **tails**")
 
-        logger.info("Coin toss called: " + str(coin_toss_call))
+    logger.info("Coin toss called: %s", coin_toss_call)
 
-        game_object = await run_coin_toss(config_data, game_id, coin_toss_call)
+    game_object = await run_coin_toss(config_data, game_id, coin_toss_call)
+    context.set_game(game_object)
 
-        coin_toss_winning_coach = await get_user_by_team(config_data, game_object["coinTossWinner"])
-        coin_toss_winning_coach_tag = coin_toss_winning_coach['discordTag']
+    coin_toss_winning_coach = await context.get_user_by_team(game_object["coinTossWinner"])
+    coin_toss_winning_coach_tag = coin_toss_winning_coach['discordTag']
 
+    async def announce_coin_toss_winner():
         coin_toss_winning_coach_object = await get_discord_user_by_name(client, coin_toss_winning_coach_tag)
-
-        # Update waiting on
-        await update_waiting_on(config_data, game_id, coin_toss_winning_coach["username"])
-
-        # Make Discord comment
         coin_toss_result_message = discord_messages["coinTossResultMessage"].format(
             winner=coin_toss_winning_coach_object.mention)
-        await create_message(message.channel, coin_toss_result_message)
-        logger.info("SUCCESS: Coin toss was run and won by " + str(coin_toss_winning_coach["username"]) +
-                    " in thread " + str(message.channel.id) + " with call " + str(coin_toss_call))
+        await create_message(message.channel, coin_toss_result_message, priority=PRIORITY_RESULT)
 
-    except Exception as e:
-        raise Exception(e)
+    # Update waiting on and make Discord comment together
+    await gather_all(
+        update_waiting_on(config_data, game_id, coin_toss_winning_coach["username"]),
+        announce_coin_toss_winner())
+    logger.info("SUCCESS: Coin toss was run and won by %s in thread %s with call %s",
+                coin_toss_winning_coach["username"], message.channel.id, coin_toss_call)
 
 
 @async_exception_handler()
-async def coin_toss_choice_command(client, config_data, discord_messages, coin_toss_choice, message):
+async def coin_toss_choice_command(client, config_data, discord_messages, coin_toss_choice, message, context):
     """
     Handle command to update a coin toss choice to receive or defer.
 
@@ -219,48 +268,46 @@ async def coin_toss_choice_command(client, config_data, discord_messages, coin_t
     :param discord_messages: Discord messages.
     :param coin_toss_choice: The coin toss choice, receive or defer.
     :param message: Discord message object.
+    :param context: Message context.
     :return: None
     """
 
-    try:
-        # Verify game is waiting on coin toss choice
-        game_object = await get_ongoing_game_by_thread_id(config_data, message.channel.id)
-        if game_object["coinTossChoice"] == "receive" or game_object["coinTossWinner"] == "defer":
-            raise GameError("Game is not waiting on a coin toss choice at this time")
+    # Verify game is waiting on coin toss choice
+    game_object = await context.get_game()
+    if game_object["coinTossChoice"] == "receive" or game_object["coinTossWinner"] == "defer":
+        raise GameError("Game is not waiting on a coin toss choice at this time")
 
-        game_id = game_object["gameId"]
+    game_id = game_object["gameId"]
 
-        # Get coin toss choice as receive or defer
-        if coin_toss_choice not in ['receive', 'defer']:
-            raise GameError("Invalid choice, game is expecting a coin toss choice of **receive** or **defer**")
+    # Get coin toss choice as receive or defer
+    if coin_toss_choice not in ['receive', 'defer']:
+        raise GameError("Invalid choice, game is expecting a coin toss choice of **receive** or **defer**")
 
-        logger.info("Coin toss choice selected: " + str(coin_toss_choice))
+    logger.info("Coin toss choice selected: %s", coin_toss_choice)
 
-        game_object = await update_coin_toss_choice(config_data, game_id, coin_toss_choice)
+    game_object = await update_coin_toss_choice(config_data, game_id, coin_toss_choice)
+    context.set_game(game_object)
 
-        # Make Discord comment
-        coin_toss_choice_message = discord_messages["coinTossChoiceMessage"].format(
-            winner=game_object["coinTossWinner"],
-            choice=game_object["coinTossChoice"])
-        await create_message(message.channel, coin_toss_choice_message)
+    # Make Discord comment
+    coin_toss_choice_message = discord_messages["coinTossChoiceMessage"].format(
+        winner=game_object["coinTossWinner"],
+        choice=game_object["coinTossChoice"])
+    await create_message(message.channel, coin_toss_choice_message, priority=PRIORITY_RESULT)
 
-        # Update the team waiting on
-        coin_toss_winner = game_object["coinTossWinner"]
-        coin_toss_choice = game_object["coinTossChoice"]
+    # Update the team waiting on
+    coin_toss_winner = game_object["coinTossWinner"]
+    coin_toss_choice = game_object["coinTossChoice"]
 
-        if coin_toss_winner == game_object["homeTeam"]:
-            receiving_team = game_object["awayTeam"] if coin_toss_choice == "defer" else game_object["homeTeam"]
-        elif coin_toss_winner == game_object["awayTeam"]:
-            receiving_team = game_object["homeTeam"] if coin_toss_choice == "defer" else game_object["awayTeam"]
-        else:
-            raise GameError("Invalid coin toss winner")
+    if coin_toss_winner == game_object["homeTeam"]:
+        receiving_team = game_object["awayTeam"] if coin_toss_choice == "defer" else game_object["homeTeam"]
+    elif coin_toss_winner == game_object["awayTeam"]:
+        receiving_team = game_object["homeTeam"] if coin_toss_choice == "defer" else game_object["awayTeam"]
+    else:
+        raise GameError("Invalid coin toss winner")
 
-        await message_defense_for_number(client, config_data, discord_messages, message, game_object, receiving_team)
-        logger.info("SUCCESS: Coin toss choice was updated to " + str(coin_toss_choice) + " in thread "
-                    + str(message.channel.id))
-
-    except Exception as e:
-        raise Exception(e)
+    await message_defense_for_number(client, config_data, discord_messages, message, game_object, receiving_team,
+                                     context)
+    logger.info("SUCCESS: Coin toss choice was updated to %s in thread %s", coin_toss_choice, message.channel.id)
 
 
 @async_exception_handler()
@@ -273,11 +320,58 @@ async def delete_game_command(config_data, message):
     :return: None
     """
 
-    try:
-        logger.info(f"Deleting game in thread {message.channel.id}")
-        await delete_game(config_data, message.channel)
-        logger.info(f"SUCCESS: Game deleted in thread {message.channel.id}")
+    logger.info("Deleting game in thread %s", message.channel.id)
+    await delete_game(config_data, message.channel)
+    logger.info("SUCCESS: Game deleted in thread %s", message.channel.id)
 
-    except Exception as e:
-        raise Exception(e)
 
+@async_exception_handler()
+async def clear_user_cache_command(message, team):
+    """
+    Handle admin command to clear cached coaches, for one team or for every team.
+
+    :param message: Discord message object.
+    :param team: Team to clear, or empty to clear every team.
+    :return: None
+    """
+
+    validate_admin(message)
+    invalidate_user_cache(team if team else None)
+    await create_message(message.channel, f"SUCCESS: Cleared the cached coach for {team}" if team else
+                         "SUCCESS: Cleared every cached coach")
+
+
+@async_exception_handler()
+async def slowest_traces_command(message, count):
+    """
+    Handle admin command to show the slowest traced messages and where their time went.
+
+    :param message: Discord message object.
+    :param count: Number of traces to show, defaults to 5.
+    :return: None
+    """
+
+    validate_admin(message)
+    if count and not count.isdigit():
+        raise InvalidParameterError("Expected the number of traces to show")
+    count = min(int(count) if count else DEFAULT_SLOWEST_TRACES, MAX_SLOWEST_TRACES)
+
+    traces = tracer.slowest(count)
+    if not traces:
+        await create_message(message.channel, "No messages have been traced yet")
+        return
+    summary = "\n\n".join(format_trace(trace) for trace in traces)
+    await create_message(message.channel, summary[:MAX_MESSAGE_LENGTH])
+
+
+def validate_admin(message):
+    """
+    Validate the message author is a server admin
+
+    :param message: Discord message object.
+    :return: None
+    """
+
+    permissions = getattr(message.author, "guild_permissions", None)
+    if permissions is None or not permissions.administrator:
+        raise GameError("Only server admins can use this command")
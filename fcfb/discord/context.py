@@ -0,0 +1,88 @@
+from fcfb.api.zebstrika.games import get_ongoing_game_by_thread_id, get_ongoing_game_by_id
+from fcfb.api.zebstrika.users import get_user_by_team
+
+
+class MessageContext:
+    """
+    Per-message context that memoizes the game and user lookups for the life of one Discord event
+    """
+
+    def __init__(self, config_data, message):
+        self.config_data = config_data
+        self.message = message
+        self._game_object = None
+        self._game_loaded = False
+        self._game_id = None
+        self._users = {}
+
+    async def get_game(self):
+        """
+        Get the ongoing game for the thread the message was sent in
+
+        :return:
+        """
+
+        if not self._game_loaded:
+            self.set_game(await get_ongoing_game_by_thread_id(self.config_data, self.message.channel.id))
+        return self._game_object
+
+    async def get_game_by_id(self, game_id):
+        """
+        Get the ongoing game by its game ID
+
+        :param game_id:
+        :return:
+        """
+
+        if not self._game_loaded or str(self._game_id) != str(game_id):
+            self.set_game(await get_ongoing_game_by_id(self.config_data, game_id))
+            self._game_id = game_id
+        return self._game_object
+
+    async def refresh_game(self):
+        """
+        Fetch the game again after it has been changed by this event
+
+        :return:
+        """
+
+        game_id = self._game_id
+        self.invalidate_game()
+        if game_id is not None:
+            return await self.get_game_by_id(game_id)
+        return await self.get_game()
+
+    def set_game(self, game_object):
+        """
+        Store a game object returned by the API so later steps do not fetch it again
+
+        :param game_object:
+        :return:
+        """
+
+        self._game_object = game_object
+        self._game_loaded = True
+        self._game_id = game_object["gameId"] if game_object is not None else None
+
+    def invalidate_game(self):
+        """
+        Forget the memoized game object
+
+        :return:
+        """
+
+        self._game_object = None
+        self._game_loaded = False
+        self._game_id = None
+
+    async def get_user_by_team(self, team):
+        """
+        Get the coach of a team, fetching each team at most once per event
+
+        :param team:
+        :return:
+        """
+
+        if team not in self._users:
+            self._users[team] = await get_user_by_team(self.config_data, team)
+        return self._users[team]
@@ -1,3 +1,4 @@
+import asyncio
 import re
 import sys
 import logging
@@ -6,26 +7,40 @@ import random
 from fcfb.main.exceptions import async_exception_handler, InvalidParameterError
 from fcfb.api.zebstrika.game_plays import submit_defensive_number, submit_offensive_number
 from fcfb.api.zebstrika.games import post_game, get_ongoing_game_by_thread_id, delete_ongoing_game, \
-    get_ongoing_game_by_id, update_waiting_on
+    update_waiting_on
 from fcfb.api.zebstrika.users import get_user_by_team
 from fcfb.discord.utils import create_game_thread, create_message, get_discord_user_by_name, delete_thread, \
     send_direct_message, find_previous_direct_message_embed_and_get_game_id, find_previous_game_channel_prompt, \
-    get_thread_by_id, craft_embed
-from fcfb.main.exceptions import GameError
+    get_thread_by_id, craft_embed, edit_message, pin_message
+from fcfb.discord.game_store import game_store
+from fcfb.discord.scheduler import PRIORITY_PROMPT, PRIORITY_RESULT
+from fcfb.main.concurrency import gather_all, gather_or_cancel
+from fcfb.discord.thread_index import game_thread_index
+from fcfb.main.exceptions import GameError, DiscordAPIError
 
 sys.path.append("..")
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
+PLAYS_BY_PLAY_TYPE = {
+    "NORMAL": ("run", "pass", "spike", "kneel", "field goal", "punt"),
+    "KICKOFF": ("normal", "onside", "squib"),
+    "POINT AFTER": ("two point", "pat")
+}
 
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+MISSING_PLAY_MESSAGES = {
+    "NORMAL": "There was not a valid play in the message, please select **run**, **pass**, **spike**, **kneel**, "
+              "**field goal**, or **punt** and try again",
+    "KICKOFF": "There was not a valid play in the message, options are **normal**, **onside**, or **squib**",
+    "POINT AFTER": "There was not a valid play in the message, options are **two point** or **pat**"
+}
+
+# One pass over the lowercased message finds the number, every play word, the runoff and the timeout
+PLAY_CALL_PATTERN = re.compile(
+    r'\b(?:(?P<number>\d+)'
+    r'|(?P<play>' + '|'.join(play for plays in PLAYS_BY_PLAY_TYPE.values() for play in plays) + r')'
+    r'|(?P<runoff>chew|hurry)'
+    r'|(?P<timeout>timeout))\b')
+
+logger = logging.getLogger(__name__)
 
 
 @async_exception_handler()
@@ -40,22 +55,11 @@ async def start_game(client, config_data, discord_messages, game_parameters):
     """
 
     game_thread = None
+    game_posted = False
 
     try:
-        # Validate the number of game parameters
-        if len(game_parameters) != 9:
-            raise InvalidParameterError(f"Expected 9 parameters but was {len(game_parameters)}.")
-
-        # Extract game parameters
-        season, week, subdivision, home_team, away_team, tv_channel, start_time, location, is_scrimmage = map(str.strip,
-                                                                                                              game_parameters)
-        # Update scrimmage
-        if is_scrimmage.lower() == 'yes':
-            is_scrimmage = 'true'
-        elif is_scrimmage.lower() == 'no':
-            is_scrimmage = 'false'
-        else:
-            raise InvalidParameterError("Expected **yes** or **no** for scrimmage parameter.")
+        season, week, subdivision, home_team, away_team, tv_channel, start_time, location, is_scrimmage = \
+            parse_game_parameters(game_parameters)
 
         # Create game thread
         game_thread = await create_game_thread(client, config_data["discord"]["game_channel_id"], home_team, away_team,
@@ -71,6 +75,8 @@ async def start_game(client, config_data, discord_messages, game_parameters):
         # Start the game
         await post_game(config_data, game_thread.thread.id, season, week, subdivision, home_team, away_team, tv_channel,
                         start_time, location, is_scrimmage)
+        game_posted = True
+        game_thread_index.add_game_thread(game_thread.thread.id)
 
         # Prompt for coin toss
         start_game_message = discord_messages["gameStartMessage"].format(
@@ -78,116 +84,181 @@ async def start_game(client, config_data, discord_messages, game_parameters):
 
         await create_message(game_thread.thread, start_game_message)
 
-    except Exception as e:
-        # If an error occurs, delete the game channel if it was created
+    except Exception:
+        # If an error occurs, roll back whatever was created for the game
         if game_thread is not None:
-            await delete_game(config_data, game_thread.thread)
-        raise Exception(e)
+            await roll_back_game_start(config_data, game_thread.thread, game_posted)
+        raise
 
 
-@async_exception_handler()
-async def delete_game(config_data, game_thread):
+def parse_game_parameters(game_parameters):
+    """
+    Validate the parameters of a game to start
+
+    :param game_parameters: Season, week, subdivision, home team, away team, tv channel, start time, location and
+                            whether it is a scrimmage
+    :return: The stripped parameters, with the scrimmage parameter as 'true' or 'false'
+    """
+
+    # Validate the number of game parameters
+    if len(game_parameters) != 9:
+        raise InvalidParameterError(f"Expected 9 parameters but was {len(game_parameters)}.")
+
+    # Extract game parameters
+    season, week, subdivision, home_team, away_team, tv_channel, start_time, location, is_scrimmage = \
+        map(str.strip, game_parameters)
+    # Update scrimmage
+    if is_scrimmage.lower() == 'yes':
+        is_scrimmage = 'true'
+    elif is_scrimmage.lower() == 'no':
+        is_scrimmage = 'false'
+    else:
+        raise InvalidParameterError("Expected **yes** or **no** for scrimmage parameter.")
+
+    return season, week, subdivision, home_team, away_team, tv_channel, start_time, location, is_scrimmage
+
+
+async def roll_back_game_start(config_data, game_thread, game_posted):
     """
-    Delete the game from the database and delete the channel
+    Delete the game and its thread after a failed start, logging instead of raising so the start error is kept
 
     :param config_data:
     :param game_thread:
+    :param game_posted: Whether the game was created in Zebstrika before the failure
     :return:
     """
 
     try:
-        game_object = await get_ongoing_game_by_thread_id(config_data, game_thread.id)
-        await delete_ongoing_game(config_data, game_object['gameId'])
-
-        if 'game_channel' in locals() and game_thread:
+        if game_posted:
+            await delete_game(config_data, game_thread)
+        else:
             await delete_thread(game_thread)
-
     except Exception as e:
-        raise Exception(e)
+        logger.error("Could not roll back the start of the game in thread %s: %s", game_thread.id, e)
 
 
 @async_exception_handler()
-async def validate_and_submit_offensive_number(client, config_data, discord_messages, message):
+async def start_games(client, config_data, discord_messages, slate, concurrency):
     """
-    Validate the offensive number and submit it to the API
+    Start a slate of games, running up to the concurrency limit at once
+
+    Each game that fails to start is rolled back on its own without stopping the others
 
     :param client:
     :param config_data:
     :param discord_messages:
-    :param message:
+    :param slate: Game parameters of each game.
+    :param concurrency: Number of games to start at once.
+    :return: The error for each game in slate order, None for the games that started
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def start(game_parameters):
+        async with semaphore:
+            try:
+                await start_game(client, config_data, discord_messages, game_parameters)
+            except Exception as e:
+                return e
+            return None
+
+    return await asyncio.gather(*(start(game_parameters) for game_parameters in slate))
+
+
+@async_exception_handler()
+async def delete_game(config_data, game_thread):
+    """
+    Delete the game from the database and delete its thread
+
+    :param config_data:
+    :param game_thread:
     :return:
     """
-    try:
-        game_object = await get_ongoing_game_by_thread_id(config_data, message.channel.id)
-        game_id = game_object["gameId"]
 
-        home_user_object, away_user_object = await get_user_objects(config_data, game_object)
+    game_object = await get_ongoing_game_by_thread_id(config_data, game_thread.id)
+    if game_object is None:
+        raise GameError(f"There is no ongoing game in thread {game_thread.id} to delete")
+    await delete_ongoing_game(config_data, game_object['gameId'])
+    game_thread_index.add_non_game_thread(game_thread.id)
+    await game_store.forget_game(game_object['gameId'])
 
-        validate_waiting_on(message, game_object, home_user_object, away_user_object)
+    await delete_thread(game_thread)
 
-        validate_possession(message, game_object, home_user_object, away_user_object)
 
-        # Get the play number
-        offensive_number = parse_play_number(message.content)
-        validate_play_number(offensive_number)
+@async_exception_handler()
+async def validate_and_submit_offensive_number(client, config_data, discord_messages, message, context):
+    """
+    Validate the offensive number and submit it to the API
 
-        # Get the play type and play id
-        play_type = game_object["currentPlayType"]
-        play_id = game_object["currentPlayId"]
+    :param client:
+    :param config_data:
+    :param discord_messages:
+    :param message:
+    :param context:
+    :return:
+    """
+    game_object = await context.get_game()
+    game_id = game_object["gameId"]
 
-        # Parse the play
-        if play_type == "NORMAL":
-            play = parse_normal_play(message.content)
-        elif play_type == "KICKOFF":
-            play = parse_kickoff_play(message.content)
-            play = "kickoff " + play  # Add kickoff to the play, as it is what the API expects
-        elif play_type == "POINT AFTER":
-            play = parse_point_after_play(message.content)
-        else:
-            return
+    home_user_object, away_user_object = await get_user_objects(context, game_object)
 
-        # Get the runoff type
-        runoff_type = parse_runoff_type(message.content)
+    validate_waiting_on(message, game_object, home_user_object, away_user_object)
 
-        # Get the offensive timeout called
-        offensive_timeout_called = parse_timeout_called(message.content)
+    validate_possession(message, game_object, home_user_object, away_user_object)
 
-        # Get the defensive timeout called
-        defensive_timeout_called = await parse_defensive_timeout_called(client, message)
+    # Get the play type and play id
+    play_type = game_object["currentPlayType"]
+    play_id = game_object["currentPlayId"]
 
-        # If defensive timeout called, set offensive timeout to false
-        if defensive_timeout_called:
-            offensive_timeout_called = False
+    # Parse the number, play, runoff type and timeout in one pass
+    play_call = parse_play_call(message.content, play_type)
+    offensive_number = play_call.number
+    validate_play_number(offensive_number)
 
-        # Get the team that starts the play with possession
-        offensive_team = home_user_object["team"] if game_object["possession"] == "home" else away_user_object["team"]
-        defensive_team = home_user_object["team"] if game_object["possession"] == "away" else away_user_object["team"]
+    if play_type not in PLAYS_BY_PLAY_TYPE:
+        return
+    validate_play(play_call.play, play_type)
+    play = play_call.play
+    if play_type == "KICKOFF":
+        play = "kickoff " + play  # Add kickoff to the play, as it is what the API expects
 
-        # Submit offensive number and get the play result
-        play_result = await submit_offensive_number(config_data, game_id, play_id, offensive_number, play, runoff_type,
-                                                    offensive_timeout_called, defensive_timeout_called)
+    runoff_type = play_call.runoff_type
+    offensive_timeout_called = play_call.timeout_called
 
-        # Print the play result
-        game_object = await get_ongoing_game_by_thread_id(config_data, message.channel.id)
-        await share_play_result(message, discord_messages, game_object, offensive_team, defensive_team, play,
-                                play_result)
+    # Get the defensive timeout called
+    defensive_timeout_called = await parse_defensive_timeout_called(client, message, game_id)
 
-        # Send the prompt for the next number
-        if play_result["possession"] == "home":
-            await message_defense_for_number(client, config_data, discord_messages, message, game_object,
-                                             play_result["awayTeam"])
-        else:
-            await message_defense_for_number(client, config_data, discord_messages, message, game_object,
-                                             play_result["homeTeam"])
-    except Exception as e:
-        raise Exception(e)
+    # If defensive timeout called, set offensive timeout to false
+    if defensive_timeout_called:
+        offensive_timeout_called = False
+
+    # Get the team that starts the play with possession
+    offensive_team = home_user_object["team"] if game_object["possession"] == "home" else away_user_object["team"]
+    defensive_team = home_user_object["team"] if game_object["possession"] == "away" else away_user_object["team"]
+
+    # Submit offensive number and get the play result
+    play_result = await submit_offensive_number(config_data, game_id, play_id, offensive_number, play, runoff_type,
+                                                offensive_timeout_called, defensive_timeout_called)
+    await game_store.clear_defensive_timeout(game_id)
+
+    # Print the play result and send the prompt for the next number together
+    game_object = await context.refresh_game()
+    next_defensive_team = play_result["awayTeam"] if play_result["possession"] == "home" \
+        else play_result["homeTeam"]
+    await gather_all(
+        share_play_result(config_data, message, discord_messages, game_object, offensive_team, defensive_team,
+                          play, play_result),
+        message_defense_for_number(client, config_data, discord_messages, message, game_object,
+                                   next_defensive_team, context))
 
 
 @async_exception_handler()
-async def share_play_result(message, discord_messages, game_object, offensive_team, defensive_team, play, play_result):
+async def share_play_result(config_data, message, discord_messages, game_object, offensive_team, defensive_team, play,
+                            play_result):
     """
     Share the play result in the game channel
 
+    :param config_data:
     :param message:
     :param discord_messages:
     :param game_object:
@@ -198,9 +269,6 @@ async def share_play_result(message, discord_messages, game_object, offensive_te
     :return:
     """
 
-    # Craft the embed with the updated game object
-    embed = await craft_embed(game_object)
-
     result = play_result['result']
     actual_result = play_result['actualResult']
     play = play.upper()
@@ -221,21 +289,88 @@ async def share_play_result(message, discord_messages, game_object, offensive_te
     if "YARDS" in result:
         result = "YARDS"
 
-    # Grab the message from the JSON
-    message_count = len(discord_messages["resultMessage"][play][result][actual_result].values())
-    message_number = str(random.randint(1, message_count))
-    message_to_send = discord_messages["resultMessage"][play][result][actual_result][message_number].format(
-        offensive_team=offensive_team,
-        defensive_team=defensive_team,
-        yards=play_result['yards'],
-        ball_location=ball_location
-    )
+    # Grab a message from the result message index compiled at startup
+    templates = discord_messages["resultMessageIndex"].get((play, result, actual_result))
+    if not templates:
+        raise GameError(f"There is no result message for {play}, {result}, {actual_result}")
+    message_to_send = render_template(random.choice(templates), {
+        "offensive_team": offensive_team,
+        "defensive_team": defensive_team,
+        "yards": play_result['yards'],
+        "ball_location": ball_location
+    })
+
+    await post_game_status(config_data, message.channel, message_to_send, game_object, PRIORITY_RESULT)
+
+
+@async_exception_handler()
+async def post_game_status(config_data, channel, message_text, game_object, priority):
+    """
+    Post a message with the game status
+
+    With the live scoreboard on, the message is posted as plain text and the game's pinned scoreboard is edited in
+    place, otherwise the status embed is attached to the message
+
+    :param config_data:
+    :param channel:
+    :param message_text:
+    :param game_object:
+    :param priority: Send priority class of the message.
+    :return:
+    """
+
+    if config_data['parameters'].get('live_scoreboard', False):
+        await gather_all(
+            create_message(channel, message_text, priority=priority),
+            update_scoreboard(channel, game_object))
+    else:
+        embed = await craft_embed(game_object)
+        await create_message(channel, message_text, embed, priority)
+
+
+@async_exception_handler()
+async def update_scoreboard(channel, game_object):
+    """
+    Edit the game's pinned scoreboard message, posting and pinning a new one if there is none
+
+    :param channel:
+    :param game_object:
+    :return:
+    """
+
+    game_id = game_object["gameId"]
+    embed = await craft_embed(game_object)
+
+    message_id = game_store.get_scoreboard_message_id(game_id)
+    if message_id is not None:
+        try:
+            await edit_message(channel.get_partial_message(int(message_id)), embed, PRIORITY_RESULT)
+            return
+        except DiscordAPIError:
+            logger.info("INFO: Could not edit the scoreboard for game %s, posting a new one", game_id)
+
+    scoreboard = await create_message(channel, "", embed, PRIORITY_RESULT)
+    await game_store.record_scoreboard(game_id, scoreboard.id)
+    try:
+        await pin_message(scoreboard)
+    except DiscordAPIError:
+        logger.info("INFO: Could not pin the scoreboard for game %s", game_id)
 
-    await create_message(message.channel, message_to_send, embed)
+
+def render_template(template, values):
+    """
+    Render a template pre-split into (literal text, field name) pairs
+
+    :param template:
+    :param values:
+    :return:
+    """
+
+    return "".join(literal + str(values[field_name]) if field_name else literal for literal, field_name in template)
 
 
 @async_exception_handler()
-async def validate_and_submit_defensive_number(client, config_data, discord_messages, message):
+async def validate_and_submit_defensive_number(client, config_data, discord_messages, message, context):
     """
     Validate the defensive number and submit it to the API
 
@@ -243,57 +378,66 @@ async def validate_and_submit_defensive_number(client, config_data, discord_mess
     :param config_data:
     :param discord_messages:
     :param message:
+    :param context:
     :return:
     """
-    try:
+    game_id = game_store.get_dm_game_id(message.author.id)
+    if game_id is None:
+        # Prompts sent before the store existed are only recorded in the DM history
         game_id, prev_message_content = await find_previous_direct_message_embed_and_get_game_id(client, message)
         game_id = game_id.split("**Game ID: ")[1].split("**")[0].strip() if game_id is not None else None
-        validate_game_id(game_id)
-
-        game_object = await get_ongoing_game_by_id(config_data, game_id)
-        play_type = game_object["currentPlayType"]
+    validate_game_id(game_id)
 
-        home_user_object, away_user_object = await get_user_objects(config_data, game_object)
+    game_object = await context.get_game_by_id(game_id)
+    if game_object is None:
+        # The game this coach was last prompted for has ended
+        await game_store.forget_game(game_id)
+        raise GameError(f"Game {game_id} is no longer ongoing, there is no number to submit")
+    play_type = game_object["currentPlayType"]
 
-        validate_waiting_on(message, game_object, home_user_object, away_user_object)
+    home_user_object, away_user_object = await get_user_objects(context, game_object)
 
-        validate_no_possession(message, game_object, home_user_object, away_user_object)
+    validate_waiting_on(message, game_object, home_user_object, away_user_object)
 
-        defensive_number = parse_play_number(message.content)
-        validate_play_number(defensive_number)
+    validate_no_possession(message, game_object, home_user_object, away_user_object)
 
-        username = get_opponent_username(game_object, home_user_object, away_user_object)
+    play_call = parse_play_call(message.content)
+    defensive_number = play_call.number
+    validate_play_number(defensive_number)
 
-        # Look if defense called timeout
-        defense_timeout_called = parse_timeout_called(message.content)
+    username = get_opponent_username(game_object, home_user_object, away_user_object)
 
-        # Submit defensive number and update waiting on
-        await submit_defensive_number(config_data, game_id, defensive_number, defense_timeout_called)
-        waiting_on = await update_waiting_on(config_data, game_id, username)
+    # Look if defense called timeout
+    defense_timeout_called = play_call.timeout_called
 
-        # Send confirmation DM and send the prompt for the offensive number
-        if defense_timeout_called:
-            await send_direct_message(message.author, f"Your defensive number has been submitted, it is "
-                                                      f"{defensive_number}. Defense called timeout.")
-        else:
-            await send_direct_message(message.author, f"Your defensive number has been submitted, it is "
-                                                      f"{defensive_number}.")
+    # Submit defensive number and update waiting on
+    await submit_defensive_number(config_data, game_id, defensive_number, defense_timeout_called)
+    _, waiting_on = await gather_all(
+        game_store.record_defensive_timeout(game_id, defense_timeout_called),
+        update_waiting_on(config_data, game_id, username))
 
-        # Send the prompt for the offensive number
-        await message_offense_for_number(client, waiting_on, discord_messages, message, game_object, home_user_object,
-                                         away_user_object, play_type, username, defense_timeout_called)
+    # Send confirmation DM and send the prompt for the offensive number together
+    if defense_timeout_called:
+        confirmation_message = f"Your defensive number has been submitted, it is {defensive_number}. " \
+                               f"Defense called timeout."
+    else:
+        confirmation_message = f"Your defensive number has been submitted, it is {defensive_number}."
 
-    except Exception as e:
-        raise Exception(e)
+    await gather_all(
+        send_direct_message(message.author, confirmation_message),
+        message_offense_for_number(client, config_data, waiting_on, discord_messages, message, game_object,
+                                   home_user_object, away_user_object, play_type, username,
+                                   defense_timeout_called))
 
 
 @async_exception_handler()
-async def message_offense_for_number(client, waiting_on, discord_messages, message, game_object, home_user_object,
-                                     away_user_object, play_type, username, defense_timeout_called):
+async def message_offense_for_number(client, config_data, waiting_on, discord_messages, message, game_object,
+                                     home_user_object, away_user_object, play_type, username, defense_timeout_called):
     """
     Message the offense for a number.
 
     :param client:
+    :param config_data:
     :param waiting_on:
     :param discord_messages:
     :param message:
@@ -306,59 +450,50 @@ async def message_offense_for_number(client, waiting_on, discord_messages, messa
     :return:
     """
 
-    try:
-        if username == home_user_object["username"]:
-            offensive_coach = home_user_object
-        else:
-            offensive_coach = away_user_object
-        offensive_coach_tag = offensive_coach["discordTag"]
-
-        offensive_coach_discord_object = await get_discord_user_by_name(client, offensive_coach_tag)
-
-        if play_type == "KICKOFF":
-            number_request_message = discord_messages["kickingNumberOffenseMessage"].format(
-                message_author=message.author.mention,
-                offensive_coach_discord_object=offensive_coach_discord_object.mention)
-        elif play_type == "NORMAL":
-            number_request_message = discord_messages["normalNumberOffenseMessage"].format(
-                message_author=message.author.mention,
-                offensive_coach_discord_object=offensive_coach_discord_object.mention)
-        elif play_type == "POINT AFTER":
-            number_request_message = discord_messages["pointAfterOffenseMessage"].format(
-                message_author=message.author.mention,
-                offensive_coach_discord_object=offensive_coach_discord_object.mention)
-        else:
-            raise GameError("Invalid current play type")
-
-        thread_id = None
-        if game_object["homePlatform"] == "Discord":
-            thread_id = game_object["homePlatformId"]
-        if game_object["awayPlatform"] == "Discord":
-            thread_id = game_object["awayPlatformId"]
+    if username == home_user_object["username"]:
+        offensive_coach = home_user_object
+    else:
+        offensive_coach = away_user_object
+    offensive_coach_tag = offensive_coach["discordTag"]
+
+    offensive_coach_discord_object = await get_discord_user_by_name(client, offensive_coach_tag)
+
+    if play_type == "KICKOFF":
+        number_request_message = discord_messages["kickingNumberOffenseMessage"].format(
+            message_author=message.author.mention,
+            offensive_coach_discord_object=offensive_coach_discord_object.mention)
+    elif play_type == "NORMAL":
+        number_request_message = discord_messages["normalNumberOffenseMessage"].format(
+            message_author=message.author.mention,
+            offensive_coach_discord_object=offensive_coach_discord_object.mention)
+    elif play_type == "POINT AFTER":
+        number_request_message = discord_messages["pointAfterOffenseMessage"].format(
+            message_author=message.author.mention,
+            offensive_coach_discord_object=offensive_coach_discord_object.mention)
+    else:
+        raise GameError("Invalid current play type")
 
-        if thread_id is None:
-            logger.info(f"INFO: Neither user is playing on Discord in game {game_object['gameId']}")
-            return
+    thread_id = get_game_thread_id(game_object)
+    if thread_id is None:
+        logger.info("INFO: Neither user is playing on Discord in game %s", game_object['gameId'])
+        return
 
-        # Update waiting on
-        game_object["waitingOn"] = waiting_on
+    # Update waiting on
+    game_object["waitingOn"] = waiting_on
 
-        embed = await craft_embed(game_object)
-        thread = await get_thread_by_id(client, thread_id)
+    thread = await get_thread_by_id(client, thread_id)
 
-        # Append if there was a timeout and the timer
-        if defense_timeout_called:
-            number_request_message += "\nThe defense has called a timeout"
-        number_request_message += f"\n\n You have until {game_object['gameTimer']} to submit a number"
+    # Append if there was a timeout and the timer
+    if defense_timeout_called:
+        number_request_message += "\nThe defense has called a timeout"
+    number_request_message += f"\n\n You have until {game_object['gameTimer']} to submit a number"
 
-        # Send the play result
-        await create_message(thread, number_request_message, embed)
-    except Exception as e:
-        raise Exception(e)
+    # Send the prompt for the offensive number
+    await post_game_status(config_data, thread, number_request_message, game_object, PRIORITY_PROMPT)
 
 
 @async_exception_handler()
-async def message_defense_for_number(client, config_data, discord_messages, message, game_object, team):
+async def message_defense_for_number(client, config_data, discord_messages, message, game_object, team, context):
     """
     Message the defense for a number.
 
@@ -368,41 +503,56 @@ async def message_defense_for_number(client, config_data, discord_messages, mess
     :param message: Discord message object.
     :param game_object: Game object.
     :param team: Team name.
+    :param context: Message context.
     :return: None
     """
 
-    try:
-        if team == game_object["homeTeam"] and game_object["homePlatform"] != "Discord":
-            logger.info("INFO: Home team is not on Discord, not attempting to message")
-            return
-        if team == game_object["awayTeam"] and game_object["awayPlatform"] != "Discord":
-            logger.info("INFO: Away team is not on Discord, not attempting to message")
-            return
+    if team == game_object["homeTeam"] and game_object["homePlatform"] != "Discord":
+        logger.info("INFO: Home team is not on Discord, not attempting to message")
+        return
+    if team == game_object["awayTeam"] and game_object["awayPlatform"] != "Discord":
+        logger.info("INFO: Away team is not on Discord, not attempting to message")
+        return
 
-        coach = await get_user_by_team(config_data, team)
-        game_id = game_object["gameId"]
-        play_type = game_object["currentPlayType"]
+    coach = await context.get_user_by_team(team)
+    game_id = game_object["gameId"]
+    play_type = game_object["currentPlayType"]
 
-        await update_waiting_on(config_data, game_id, coach["username"])
+    _, coach_discord_object = await gather_all(
+        update_waiting_on(config_data, game_id, coach["username"]),
+        get_discord_user_by_name(client, coach["discordTag"]))
 
-        embed = await craft_embed(game_object)
-        coach_tag = coach["discordTag"]
-        coach_discord_object = await get_discord_user_by_name(client, coach_tag)
-
-        if play_type == "KICKOFF":
-            number_message = discord_messages["kickingNumberDefenseMessage"]
-        elif play_type == "NORMAL":
-            number_message = discord_messages["normalNumberDefenseMessage"]
-        elif play_type == "POINT AFTER":
-            number_message = discord_messages["pointAfterDefenseMessage"]
-        else:
-            raise GameError("Invalid current play type")
+    embed = await craft_embed(game_object)
+
+    if play_type == "KICKOFF":
+        number_message = discord_messages["kickingNumberDefenseMessage"]
+    elif play_type == "NORMAL":
+        number_message = discord_messages["normalNumberDefenseMessage"]
+    elif play_type == "POINT AFTER":
+        number_message = discord_messages["pointAfterDefenseMessage"]
+    else:
+        raise GameError("Invalid current play type")
 
-        await send_direct_message(coach_discord_object, number_message, embed)
-        logger.info("SUCCESS: Defense was messaged for a number in channel " + str(message.channel.id))
+    # Record the game before the coach can see the prompt, so even a quick reply is routed to this game's queue
+    await game_store.record_dm_prompt(coach_discord_object.id, game_id, get_game_thread_id(game_object))
+    await send_direct_message(coach_discord_object, number_message, embed, PRIORITY_PROMPT)
+    logger.info("SUCCESS: Defense was messaged for a number in channel %s", message.channel.id)
 
-    except Exception as e:
-        raise Exception(e)
+
+def get_game_thread_id(game_object):
+    """
+    Get the ID of the Discord thread the game is played in, or None if neither team is on Discord
+
+    :param game_object:
+    :return:
+    """
+
+    thread_id = None
+    if game_object["homePlatform"] == "Discord":
+        thread_id = game_object["homePlatformId"]
+    if game_object["awayPlatform"] == "Discord":
+        thread_id = game_object["awayPlatformId"]
+    return thread_id
 
 
 def get_opponent_username(game_object, home_user_object, away_user_object):
@@ -420,16 +570,17 @@ def get_opponent_username(game_object, home_user_object, away_user_object):
 
 
 @async_exception_handler()
-async def get_user_objects(config_data, game_object):
+async def get_user_objects(context, game_object):
     """
-    Get the game and user objects from the game id
-    :param config_data:
+    Get the home and away user objects for the game, memoized on the message context
+    :param context:
     :param game_object:
     :return:
     """
 
-    home_user_object = await get_user_by_team(config_data, game_object["homeTeam"])
-    away_user_object = await get_user_by_team(config_data, game_object["awayTeam"])
+    home_user_object, away_user_object = await gather_or_cancel(
+        context.get_user_by_team(game_object["homeTeam"]),
+        context.get_user_by_team(game_object["awayTeam"]))
 
     return home_user_object, away_user_object
 
@@ -499,124 +650,92 @@ def validate_possession(message, game_object, home_user_object, away_user_object
                         "submit the number in DMs instead.")
 
 
-def parse_play_number(message_content):
-    """
-    Parse the play number from the message content
-
-    :param message_content:
-    :return:
-    """
-
-    play_number = re.search(r'\b\d+\b', message_content)
-
-    if play_number:
-        return int(play_number.group())
-    else:
-        raise GameError("I could not find a valid number in the message")
-
-
-def validate_play_number(play_number):
-    """
-    Validate the play number is between 1 and 1500, inclusive
-
-    :param play_number:
-    :return:
-    """
-
-    if not (1 <= play_number <= 1500):
-        raise GameError("The number submitted is not between 1 and 1500")
-
-
-def parse_normal_play(message_content):
+class PlayCall:
     """
-    Parse the normal play type from the message content
-
-    :param message_content:
-    :return:
+    Number, play, runoff type and timeout parsed from a number submission
     """
 
-    play_type_match = re.search(r'\b(run|pass|spike|kneel|field goal|punt)\b', message_content, flags=re.IGNORECASE)
+    __slots__ = ("number", "play", "runoff_type", "timeout_called")
 
-    if play_type_match:
-        return play_type_match.group().lower()
-    else:
-        raise GameError("There was not a valid play in the message, please select **run**, **pass**, **spike**, "
-                        "**kneel**, **field goal**, or **punt** and try again")
+    def __init__(self, number, play, runoff_type, timeout_called):
+        self.number = number
+        self.play = play
+        self.runoff_type = runoff_type
+        self.timeout_called = timeout_called
 
 
-def parse_kickoff_play(message_content):
+def parse_play_call(message_content, play_type=None):
     """
-    Parse the kickoff play type from the message content
-
-    :param message_content:
-    :return:
-    """
-
-    play_type_match = re.search(r'\b(normal|onside|squib)\b', message_content, flags=re.IGNORECASE)
-
-    if play_type_match:
-        return play_type_match.group().lower()
-    else:
-        raise GameError("There was not a valid play in the message, options are **normal**, **onside**, or **squib**")
+    Parse the number, the play allowed for the play type, the runoff type and the timeout from the message content
 
-
-def parse_point_after_play(message_content):
-    """
-    Parse the point after play type from the message content
+    The first match of each wins, as with the individual parse functions
 
     :param message_content:
+    :param play_type: Current play type, or None to skip parsing the play.
     :return:
     """
 
-    play_type_match = re.search(r'\b(two point|pat)\b', message_content, flags=re.IGNORECASE)
+    allowed_plays = PLAYS_BY_PLAY_TYPE.get(play_type, ())
+    number = play = runoff_type = None
+    timeout_called = False
+
+    for number_token, play_token, runoff_token, timeout_token in PLAY_CALL_PATTERN.findall(message_content.lower()):
+        if number_token:
+            if number is None:
+                number = int(number_token)
+        elif play_token:
+            if play is None and play_token in allowed_plays:
+                play = play_token
+        elif runoff_token:
+            if runoff_type is None:
+                runoff_type = runoff_token
+        else:
+            timeout_called = True
 
-    if play_type_match:
-        return play_type_match.group().lower()
-    else:
-        raise GameError("There was not a valid play in the message, options are **two point** or **pat**")
+    if number is None:
+        raise GameError("I could not find a valid number in the message")
+    return PlayCall(number, play, runoff_type or "normal", timeout_called)
 
 
-def parse_runoff_type(message_content):
+def validate_play(play, play_type):
     """
-    Parse the runoff type from the message content
+    Validate a play was found for the play type
 
-    :param message_content:
+    :param play:
+    :param play_type:
     :return:
     """
 
-    runoff_match = re.search(r'\b(chew|hurry)\b', message_content, flags=re.IGNORECASE)
+    if play is None:
+        raise GameError(MISSING_PLAY_MESSAGES[play_type])
 
-    if runoff_match:
-        return runoff_match.group().lower()
-    else:
-        return "normal"
 
-
-def parse_timeout_called(message_content):
+def validate_play_number(play_number):
     """
-    Parse the timeout called from the message content
+    Validate the play number is between 1 and 1500, inclusive
 
-    :param message_content:
+    :param play_number:
     :return:
     """
 
-    timeout_match = re.search(r'\b(timeout)\b', message_content, flags=re.IGNORECASE)
-
-    if timeout_match:
-        return True
-    else:
-        return False
+    if not (1 <= play_number <= 1500):
+        raise GameError("The number submitted is not between 1 and 1500")
 
 
-async def parse_defensive_timeout_called(client, message):
+async def parse_defensive_timeout_called(client, message, game_id):
     """
-    Parse if defense timeout called from the previous message embed
+    Get if defense timeout called from the local game store, falling back to the previous prompt in the thread
 
     :param client:
     :param message:
+    :param game_id:
     :return:
     """
 
+    defensive_timeout_called = game_store.get_defensive_timeout(game_id)
+    if defensive_timeout_called is not None:
+        return defensive_timeout_called
+
     prev_message_content = await find_previous_game_channel_prompt(client, message)
 
     if "The defense has called a timeout" in prev_message_content:
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import logging
+
+DEFAULT_STATE_FILE = "hypnotoad_state.json"
+
+logger = logging.getLogger(__name__)
+
+
+class LocalGameStore:
+    """
+    Bot-side game state kept in memory and snapshotted to a local file so it survives restarts
+    """
+
+    def __init__(self):
+        self.path = None
+        self._dm_games = {}
+        self._game_threads = {}
+        self._defensive_timeouts = {}
+        self._scoreboards = {}
+        self._save_lock = asyncio.Lock()
+
+    def load(self, path):
+        """
+        Load the last snapshot, starting empty if there is none
+
+        :param path:
+        :return:
+        """
+
+        self.path = path
+        try:
+            with open(path, 'r') as state_file:
+                state = json.load(state_file)
+        except FileNotFoundError:
+            logger.info("INFO: No local game state found at %s, starting empty", path)
+            return
+        except (OSError, ValueError) as e:
+            logger.error("Could not read the local game state at %s, starting empty: %s", path, e)
+            return
+
+        self._dm_games = state.get("dmGames", {})
+        self._game_threads = state.get("gameThreads", {})
+        self._defensive_timeouts = state.get("defensiveTimeouts", {})
+        self._scoreboards = state.get("scoreboards", {})
+        logger.info("SUCCESS: Loaded local game state for %s coaches", len(self._dm_games))
+
+    def clear(self):
+        """
+        Forget every game in memory, leaving the snapshot file as it is
+
+        :return:
+        """
+
+        self._dm_games = {}
+        self._game_threads = {}
+        self._defensive_timeouts = {}
+        self._scoreboards = {}
+
+    def snapshot(self):
+        return {"dmGames": dict(self._dm_games), "gameThreads": dict(self._game_threads),
+                "defensiveTimeouts": dict(self._defensive_timeouts), "scoreboards": dict(self._scoreboards)}
+
+    async def save(self):
+        """
+        Write the snapshot off the event loop, replacing the previous file atomically
+
+        :return:
+        """
+
+        if self.path is None:
+            return
+        async with self._save_lock:
+            await asyncio.to_thread(write_snapshot, self.path, self.snapshot())
+
+    def get_dm_game_id(self, user_id):
+        return self._dm_games.get(str(user_id))
+
+    def get_game_thread_id(self, game_id):
+        return self._game_threads.get(str(game_id))
+
+    async def record_dm_prompt(self, user_id, game_id, thread_id=None):
+        self._dm_games[str(user_id)] = game_id
+        if thread_id is not None:
+            self._game_threads[str(game_id)] = thread_id
+        await self.save()
+
+    def get_defensive_timeout(self, game_id):
+        """
+        Whether the defense called a timeout on the pending play, or None if it was not recorded
+
+        :param game_id:
+        :return:
+        """
+
+        return self._defensive_timeouts.get(str(game_id))
+
+    async def record_defensive_timeout(self, game_id, timeout_called):
+        self._defensive_timeouts[str(game_id)] = timeout_called
+        await self.save()
+
+    async def clear_defensive_timeout(self, game_id):
+        if self._defensive_timeouts.pop(str(game_id), None) is not None:
+            await self.save()
+
+    def get_scoreboard_message_id(self, game_id):
+        return self._scoreboards.get(str(game_id))
+
+    async def record_scoreboard(self, game_id, message_id):
+        self._scoreboards[str(game_id)] = message_id
+        await self.save()
+
+    async def forget_game(self, game_id):
+        dm_games = {user_id: dm_game_id for user_id, dm_game_id in self._dm_games.items()
+                    if str(dm_game_id) != str(game_id)}
+        removed = len(dm_games) != len(self._dm_games)
+        self._dm_games = dm_games
+        for games in (self._game_threads, self._defensive_timeouts, self._scoreboards):
+            removed = games.pop(str(game_id), None) is not None or removed
+        if removed:
+            await self.save()
+
+    async def forget_thread(self, thread_id):
+        """
+        Forget the games played in a thread that no longer holds an ongoing game
+
+        :param thread_id:
+        :return:
+        """
+
+        for game_id in [game_id for game_id, game_thread_id in self._game_threads.items()
+                        if str(game_thread_id) == str(thread_id)]:
+            await self.forget_game(game_id)
+
+
+def write_snapshot(path, state):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as state_file:
+        json.dump(state, state_file)
+    os.replace(temp_path, path)
+
+
+game_store = LocalGameStore()
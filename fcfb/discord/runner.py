@@ -1,24 +1,167 @@
+import asyncio
 import discord
 import sys
 import logging
 
-from fcfb.main.exceptions import async_exception_handler
+from fcfb.api.zebstrika.cache import configure_caches, game_cache, user_cache
+from fcfb.api.zebstrika.client import open_zebstrika_session, close_zebstrika_session, circuit_breaker, single_flight
+from fcfb.api.zebstrika.users import warm_user_cache
+from fcfb.main.capture import event_recorder
+from fcfb.main.exceptions import log_event_error
+from fcfb.main.metrics import metrics, start_metrics_server, stop_metrics_server
+from fcfb.main.tracing import tracer, bind_to_current_span, DEFAULT_SLOW_TRACE_COUNT
+from fcfb.discord.context import MessageContext
 from fcfb.discord.commands import parse_game_thread_commands, parse_commands, parse_direct_message_number_submission
-from fcfb.discord.utils import check_if_location_is_game_thread
+from fcfb.discord.utils import check_if_location_is_game_thread, fetched_threads
+from fcfb.discord.game_store import game_store, DEFAULT_STATE_FILE
+from fcfb.discord.scheduler import message_scheduler, DEFAULT_GLOBAL_RATE, PRIORITY_NAMES
+from fcfb.discord.tag_index import forum_tag_index
+from fcfb.discord.thread_index import seed_game_thread_index, game_thread_index
+from fcfb.discord.user_index import discord_user_index
 
 sys.path.append("..")
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
+DEFAULT_WORKER_IDLE_TIMEOUT = 60
 
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+logger = logging.getLogger(__name__)
+
+
+class GameDispatcher:
+    """
+    Route events to one queue per game, so work for a game runs in order while different games run in parallel
+    """
+
+    def __init__(self, idle_timeout=DEFAULT_WORKER_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._queues = {}
+        self._workers = {}
+
+    async def submit(self, key, job):
+        """
+        Queue the job behind earlier work for the same key and wait for its result
+
+        :param key: Game key, or None to run the job straight away.
+        :param job: Coroutine function to run.
+        :return: The job's result.
+        """
+
+        if key is None:
+            return await job()
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.create_task(self._drain(key, queue))
+
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((job, future))
+        return await future
+
+    async def _drain(self, key, queue):
+        try:
+            while True:
+                try:
+                    job, future = await asyncio.wait_for(queue.get(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    if queue.empty():
+                        # Reap the idle worker, the next event for this game starts a new one
+                        return
+                    continue
+
+                try:
+                    result = await job()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    # The job ended with a BaseException such as cancellation, which stops the worker
+                    if not future.done():
+                        future.cancel()
+        finally:
+            if self._workers.get(key) is asyncio.current_task():
+                del self._queues[key]
+                del self._workers[key]
+            # Nothing will run the jobs still queued for a worker that stopped early, so release their callers
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                future.cancel()
+
+    def __len__(self):
+        return len(self._workers)
+
+
+def get_dispatch_key(message):
+    """
+    Get the key of the game a message belongs to, using the game thread ID for both threads and DMs
+
+    :param message:
+    :return:
+    """
+
+    if isinstance(message.channel, discord.DMChannel):
+        game_id = game_store.get_dm_game_id(message.author.id)
+        thread_id = game_store.get_game_thread_id(game_id) if game_id is not None else None
+        return str(thread_id) if thread_id is not None else f"dm-{message.author.id}"
+    if isinstance(message.channel, discord.Thread):
+        return str(message.channel.id)
+    return None
+
+
+def register_runtime_metrics(dispatcher):
+    """
+    Export the counts the caches, scheduler and dispatcher already keep, read whenever the metrics are scraped
+
+    :param dispatcher:
+    :return:
+    """
+
+    caches = {"game": game_cache, "user": user_cache, "fetched_thread": fetched_threads}
+    metrics.collected("hypnotoad_cache_hits_total", "Cache hits by cache", ("cache",),
+                      lambda: (((name,), cache.hits) for name, cache in caches.items()), kind="counter")
+    metrics.collected("hypnotoad_cache_misses_total", "Cache misses by cache", ("cache",),
+                      lambda: (((name,), cache.misses) for name, cache in caches.items()), kind="counter")
+    metrics.collected("hypnotoad_zebstrika_coalesced_total", "Zebstrika reads that joined an identical read in flight",
+                      (), lambda: (((), single_flight.coalesced),), kind="counter")
+    metrics.collected("hypnotoad_zebstrika_circuit_open", "Whether the Zebstrika circuit breaker is open", (),
+                      lambda: (((), int(circuit_breaker.is_open)),))
+    metrics.collected("hypnotoad_send_queue_depth", "Outbound Discord sends waiting to go out", (),
+                      lambda: (((), message_scheduler.queue_depth),))
+    metrics.collected("hypnotoad_sends_total", "Outbound Discord sends by priority", ("priority",),
+                      lambda: (((name,), message_scheduler.sent[priority])
+                               for priority, name in PRIORITY_NAMES.items()), kind="counter")
+    metrics.collected("hypnotoad_send_failures_total", "Outbound Discord sends that failed by priority", ("priority",),
+                      lambda: (((name,), message_scheduler.failed[priority])
+                               for priority, name in PRIORITY_NAMES.items()), kind="counter")
+    metrics.collected("hypnotoad_send_latency_seconds_total", "Time outbound Discord sends spent queued and sending",
+                      ("priority",),
+                      lambda: (((name,), message_scheduler.latency_total[priority])
+                               for priority, name in PRIORITY_NAMES.items()), kind="counter")
+    metrics.collected("hypnotoad_send_latency_max_seconds", "Longest an outbound Discord send spent queued and sending",
+                      ("priority",),
+                      lambda: (((name,), message_scheduler.latency_max[priority])
+                               for priority, name in PRIORITY_NAMES.items()))
+    metrics.collected("hypnotoad_game_workers", "Games with a running dispatch worker", (),
+                      lambda: (((), len(dispatcher)),))
+    metrics.collected("hypnotoad_game_threads", "Threads indexed as holding an ongoing game", (),
+                      lambda: (((), len(game_thread_index)),))
+
+
+def get_message_kind(message):
+    """
+    Get where a message was sent, as recorded in replay fixtures
+
+    :param message:
+    :return: "dm", "thread" or "channel"
+    """
+
+    if isinstance(message.channel, discord.DMChannel):
+        return "dm"
+    if isinstance(message.channel, discord.Thread):
+        return "thread"
+    return "channel"
 
 
 def run_hypnotoad(config_data, discord_messages):
@@ -40,27 +183,99 @@ def run_hypnotoad(config_data, discord_messages):
     intents.presences = True
     client = discord.Client(intents=intents)
 
+    configure_caches(config_data)
+    game_store.load(config_data['parameters'].get('state_file', DEFAULT_STATE_FILE))
+    message_scheduler.configure(config_data['discord'].get('global_rate_limit', DEFAULT_GLOBAL_RATE))
+    dispatcher = GameDispatcher(config_data['parameters'].get('worker_idle_timeout', DEFAULT_WORKER_IDLE_TIMEOUT))
+    register_runtime_metrics(dispatcher)
+    tracer.configure(config_data['parameters'].get('trace_file'),
+                     config_data['parameters'].get('slow_trace_count', DEFAULT_SLOW_TRACE_COUNT))
+    event_recorder.configure(config_data['parameters'].get('capture_file'), config_data['api']['url'])
+
     @client.event
-    @async_exception_handler()
     async def on_message(message):
         if message.author.bot:
             return
 
+        trace_id = None
+        try:
+            async with tracer.trace("on_message", channel=message.channel.id, author=message.author.name) as trace:
+                trace_id = trace.trace_id
+                if event_recorder.enabled:
+                    await event_recorder.record_message(message, get_message_kind(message))
+                context = MessageContext(config_data, message)
+                await dispatcher.submit(get_dispatch_key(message),
+                                        bind_to_current_span(lambda: handle_message(message, context)))
+        except Exception as e:
+            log_event_error("on_message", e, trace=trace_id, channel=message.channel.id, author=message.author.name,
+                            content=message.content)
+
+    async def handle_message(message, context):
         if message.content.startswith(prefix):
-            await parse_commands(client, config_data, discord_messages, prefix, message)
+            await parse_commands(client, config_data, discord_messages, prefix, message, context)
         elif isinstance(message.channel, discord.DMChannel):
-            await parse_direct_message_number_submission(client, config_data, discord_messages, message)
+            await parse_direct_message_number_submission(client, config_data, discord_messages, message, context)
 
-        elif await check_if_location_is_game_thread(config_data, message):
-            await parse_game_thread_commands(client, config_data, discord_messages, message)
+        elif await check_if_location_is_game_thread(context, message):
+            await parse_game_thread_commands(client, config_data, discord_messages, message, context)
 
     @client.event
-    @async_exception_handler()
     async def on_ready():
         logger.info('------')
         logger.info('Logged in as')
-        logger.info(client.user.name)
-        logger.info(client.user.id)
+        logger.info("%s", client.user.name)
+        logger.info("%s", client.user.id)
         logger.info('------')
 
-    client.run(token)
+        discord_user_index.build(client.users)
+        try:
+            ongoing_games = await seed_game_thread_index(client, config_data)
+            await warm_user_cache(config_data, ongoing_games)
+        except Exception as e:
+            log_event_error("on_ready", e)
+
+    @client.event
+    async def on_member_join(member):
+        discord_user_index.add(member)
+
+    @client.event
+    async def on_member_update(before, after):
+        discord_user_index.update(before, after)
+
+    @client.event
+    async def on_user_update(before, after):
+        discord_user_index.update(before, after)
+
+    @client.event
+    async def on_member_remove(member):
+        # Keep the user indexed while they still share another server with the bot
+        if not any(guild.get_member(member.id) for guild in client.guilds):
+            discord_user_index.remove(member)
+
+    @client.event
+    async def on_raw_thread_delete(payload):
+        fetched_threads.pop(payload.thread_id)
+
+    @client.event
+    async def on_guild_channel_update(before, after):
+        if isinstance(after, discord.ForumChannel):
+            forum_tag_index.refresh(after)
+
+    @client.event
+    async def on_guild_channel_delete(channel):
+        forum_tag_index.forget(channel.id)
+
+    async def run_client():
+        async with client:
+            await open_zebstrika_session(config_data)
+            metrics_server = await start_metrics_server(config_data)
+            try:
+                await client.start(token)
+            finally:
+                await stop_metrics_server(metrics_server)
+                await close_zebstrika_session()
+
+    try:
+        asyncio.run(run_client())
+    except KeyboardInterrupt:
+        logger.info("Hypnotoad shutting down")
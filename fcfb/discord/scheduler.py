@@ -0,0 +1,138 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+PRIORITY_PROMPT = 0
+PRIORITY_RESULT = 1
+PRIORITY_INFO = 2
+PRIORITY_NAMES = {PRIORITY_PROMPT: "prompt", PRIORITY_RESULT: "result", PRIORITY_INFO: "info"}
+
+# Stay under Discord's global limit of 50 requests per second
+DEFAULT_GLOBAL_RATE = 45
+DEFAULT_IDLE_TIMEOUT = 60
+
+
+class TokenBucket:
+    """
+    Global send budget, handed out to waiting senders in priority order
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, priority):
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                self._refill()
+                if self._waiters[0] == entry and self._tokens >= 1:
+                    heapq.heappop(self._waiters)
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(max(1 - self._tokens, 1) / self.rate)
+        except asyncio.CancelledError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+
+class MessageScheduler:
+    """
+    Outbound Discord send scheduler with one queue per channel and priority classes
+
+    Each channel's sends go out one at a time, most urgent first, and every send takes a token from the global budget
+    """
+
+    def __init__(self, rate=DEFAULT_GLOBAL_RATE, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._bucket = TokenBucket(rate)
+        self._queues = {}
+        self._workers = {}
+        self._sequence = itertools.count()
+        self.sent = {priority: 0 for priority in PRIORITY_NAMES}
+        self.failed = {priority: 0 for priority in PRIORITY_NAMES}
+        self.latency_total = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.latency_max = {priority: 0.0 for priority in PRIORITY_NAMES}
+
+    def configure(self, rate):
+        self._bucket = TokenBucket(rate)
+
+    async def send(self, key, send, priority=PRIORITY_INFO):
+        """
+        Queue a send on the channel's queue and wait for it to go out
+
+        :param key: Channel or user the send goes to.
+        :param send: Coroutine function making the Discord call.
+        :param priority: One of the PRIORITY_ classes.
+        :return: The result of the send.
+        """
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.PriorityQueue()
+            self._workers[key] = asyncio.create_task(self._drain(key, queue))
+
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((priority, next(self._sequence), time.monotonic(), send, future))
+        return await future
+
+    async def _drain(self, key, queue):
+        try:
+            while True:
+                try:
+                    priority, _, queued_at, send, future = await asyncio.wait_for(queue.get(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    if queue.empty():
+                        # Reap the idle worker, the next send to this channel starts a new one
+                        return
+                    continue
+
+                if future.cancelled():
+                    continue
+
+                try:
+                    await self._bucket.acquire(priority)
+                    result = await send()
+                except Exception as e:
+                    self.failed[priority] += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    latency = time.monotonic() - queued_at
+                    self.sent[priority] += 1
+                    self.latency_total[priority] += latency
+                    self.latency_max[priority] = max(self.latency_max[priority], latency)
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    # The send ended with a BaseException such as cancellation, which stops the worker
+                    if not future.done():
+                        future.cancel()
+        finally:
+            if self._workers.get(key) is asyncio.current_task():
+                del self._queues[key]
+                del self._workers[key]
+            # Nothing will make the sends still queued for a worker that stopped early, so release their callers
+            while not queue.empty():
+                _, _, _, _, future = queue.get_nowait()
+                future.cancel()
+
+    @property
+    def queue_depth(self):
+        return sum(queue.qsize() for queue in self._queues.values())
+
+
+message_scheduler = MessageScheduler()
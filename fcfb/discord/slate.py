@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+
+from fcfb.discord.game import parse_game_parameters
+from fcfb.discord.utils import MAX_MESSAGE_LENGTH
+from fcfb.main.exceptions import InvalidParameterError
+
+SLATE_FIELDS = ("season", "week", "subdivision", "home_team", "away_team", "tv_channel", "start_time", "location",
+                "is_scrimmage")
+DEFAULT_BULK_START_CONCURRENCY = 5
+MAX_REPORTED_ROWS = 15
+
+
+def parse_slate(filename, content):
+    """
+    Parse and validate an attached CSV or JSON schedule
+
+    CSV rows hold the nine start parameters in order, with an optional header row. JSON is a list of nine-item
+    lists or of objects keyed by SLATE_FIELDS. Every row is validated before any game is started
+
+    :param filename: Name of the attachment, used to tell JSON from CSV.
+    :param content: Raw bytes of the attachment.
+    :return: The game parameters of each row
+    """
+
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise InvalidParameterError("The schedule must be a UTF-8 encoded CSV or JSON file")
+
+    if filename.lower().endswith('.json') or text.lstrip().startswith('['):
+        slate = parse_json_rows(text)
+    else:
+        slate = parse_csv_rows(text)
+    if not slate:
+        raise InvalidParameterError("The schedule does not have any games")
+
+    errors = []
+    team_rows = {}
+    for row_number, game_parameters in enumerate(slate, start=1):
+        try:
+            home_team, away_team = parse_game_parameters(game_parameters)[3:5]
+        except InvalidParameterError as e:
+            errors.append(f"Row {row_number}: {e}")
+            continue
+
+        for team in (home_team, away_team):
+            if team.lower() in team_rows:
+                errors.append(f"Row {row_number}: {team} is already playing in row {team_rows[team.lower()]}")
+            else:
+                team_rows[team.lower()] = row_number
+
+    if errors:
+        raise InvalidParameterError("No games were started, the schedule has errors\n" + format_rows(errors))
+    return slate
+
+
+def parse_csv_rows(text):
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if rows and rows[0][0].strip().lower() == "season":
+        rows = rows[1:]
+    return rows
+
+
+def parse_json_rows(text):
+    try:
+        rows = json.loads(text)
+    except ValueError as e:
+        raise InvalidParameterError(f"The schedule is not valid JSON, {e}")
+    if not isinstance(rows, list):
+        raise InvalidParameterError("The JSON schedule must be a list of games")
+
+    slate = []
+    for row_number, row in enumerate(rows, start=1):
+        if isinstance(row, dict):
+            missing_fields = [field for field in SLATE_FIELDS if field not in row]
+            if missing_fields:
+                raise InvalidParameterError(f"Row {row_number}: missing {', '.join(missing_fields)}")
+            row = [row[field] for field in SLATE_FIELDS]
+        elif not isinstance(row, list):
+            raise InvalidParameterError(f"Row {row_number}: expected a list or an object")
+        slate.append([format_json_value(value) for value in row])
+    return slate
+
+
+def format_json_value(value):
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return str(value)
+
+
+def summarize_slate(slate, errors):
+    """
+    Build the single summary message for a started slate
+
+    :param slate: Game parameters of each game.
+    :param errors: The error for each game in slate order, None for the games that started.
+    :return:
+    """
+
+    failures = [f"Row {row_number}, {game_parameters[4].strip()} at {game_parameters[3].strip()}: {error}"
+                for row_number, (game_parameters, error) in enumerate(zip(slate, errors), start=1)
+                if error is not None]
+    summary = f"Started {len(slate) - len(failures)} of {len(slate)} games"
+    if not failures:
+        return f"SUCCESS: {summary}"
+    return f"ERROR: {summary}, these games were rolled back\n" + format_rows(failures)
+
+
+def format_rows(rows):
+    lines = rows[:MAX_REPORTED_ROWS]
+    if len(rows) > MAX_REPORTED_ROWS:
+        lines.append(f"...and {len(rows) - MAX_REPORTED_ROWS} more")
+    text = "\n".join(lines)
+    # Leave room for the heading
+    return text if len(text) <= MAX_MESSAGE_LENGTH - 100 else text[:MAX_MESSAGE_LENGTH - 103] + "..."
@@ -0,0 +1,57 @@
+import asyncio
+
+
+class ForumTagIndex:
+    """
+    Tags of each game forum by name, so tags for a new thread resolve without scanning the forum's tag list
+    """
+
+    def __init__(self):
+        self._tags = {}
+        self._locks = {}
+
+    def get_tags(self, channel):
+        tags = self._tags.get(channel.id)
+        if tags is None:
+            tags = self.refresh(channel)
+        return tags
+
+    def refresh(self, channel):
+        """
+        Rebuild the forum's entry from its current tag list
+
+        :param channel: Forum channel
+        :return:
+        """
+
+        tags = {tag.name: tag for tag in channel.available_tags}
+        self._tags[channel.id] = tags
+        return tags
+
+    def missing(self, channel, names):
+        tags = self.get_tags(channel)
+        return [name for name in dict.fromkeys(names) if name not in tags]
+
+    def resolve(self, channel, names):
+        tags = self.get_tags(channel)
+        return [tags[name] for name in dict.fromkeys(names) if name in tags]
+
+    def creation_lock(self, channel_id):
+        """
+        Lock held while a forum's tags are being created, so games starting together do not create them twice
+
+        :param channel_id:
+        :return:
+        """
+
+        lock = self._locks.get(channel_id)
+        if lock is None:
+            lock = self._locks[channel_id] = asyncio.Lock()
+        return lock
+
+    def forget(self, channel_id):
+        self._tags.pop(channel_id, None)
+        self._locks.pop(channel_id, None)
+
+
+forum_tag_index = ForumTagIndex()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+from fcfb.api.zebstrika.cache import TTLCache
+from fcfb.api.zebstrika.games import get_ongoing_game_by_thread_id
+
+NON_GAME_THREAD_CACHE_SIZE = 4096
+NON_GAME_THREAD_CACHE_TTL = 3600
+SEED_CONCURRENCY = 10
+
+logger = logging.getLogger(__name__)
+
+
+class GameThreadIndex:
+    """
+    In-memory index of which Discord threads hold an ongoing game, so chatter can be filtered without API calls
+    """
+
+    def __init__(self):
+        self._game_threads = set()
+        self._non_game_threads = TTLCache(NON_GAME_THREAD_CACHE_SIZE, NON_GAME_THREAD_CACHE_TTL)
+
+    def is_game_thread(self, thread_id):
+        return thread_id in self._game_threads
+
+    def is_non_game_thread(self, thread_id):
+        return self._non_game_threads.get(thread_id, False)
+
+    def add_game_thread(self, thread_id):
+        self._game_threads.add(thread_id)
+        self._non_game_threads.pop(thread_id)
+
+    def add_non_game_thread(self, thread_id):
+        self._game_threads.discard(thread_id)
+        self._non_game_threads.set(thread_id, True)
+
+    def clear(self):
+        self._game_threads.clear()
+        self._non_game_threads.clear()
+
+    def __len__(self):
+        return len(self._game_threads)
+
+
+game_thread_index = GameThreadIndex()
+
+
+async def seed_game_thread_index(client, config_data):
+    """
+    Seed the game thread index from the active threads in the games channel
+
+    :param client:
+    :param config_data:
+    :return:
+    """
+
+    game_channel = client.get_channel(int(config_data["discord"]["game_channel_id"]))
+    if game_channel is None:
+        logger.info("INFO: Could not find the games channel, the game thread index was not seeded")
+        return []
+
+    semaphore = asyncio.Semaphore(SEED_CONCURRENCY)
+
+    async def index_thread(thread):
+        try:
+            async with semaphore:
+                game_object = await get_ongoing_game_by_thread_id(config_data, thread.id)
+        except Exception as e:
+            logger.error("Could not index thread %s, it will be looked up on its next message: %s", thread.id, e)
+            return None
+
+        if game_object is None:
+            game_thread_index.add_non_game_thread(thread.id)
+        else:
+            game_thread_index.add_game_thread(thread.id)
+        return game_object
+
+    game_objects = await asyncio.gather(*(index_thread(thread) for thread in game_channel.threads))
+    logger.info("SUCCESS: Seeded the game thread index with %s ongoing games", len(game_thread_index))
+    return [game_object for game_object in game_objects if game_object is not None]
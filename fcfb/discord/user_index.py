@@ -0,0 +1,58 @@
+import logging
+
+QUERY_MEMBERS_LIMIT = 5
+
+logger = logging.getLogger(__name__)
+
+
+class DiscordUserIndex:
+    """
+    Index of Discord users by name, kept current by member events instead of scanning client.users
+    """
+
+    def __init__(self):
+        self._users = {}
+
+    def build(self, users):
+        self._users = {user.name: user for user in users}
+        logger.info("SUCCESS: Built the Discord user index with %s users", len(self._users))
+
+    def get(self, name):
+        return self._users.get(name)
+
+    def add(self, user):
+        self._users[user.name] = user
+
+    def remove(self, user):
+        indexed_user = self._users.get(user.name)
+        if indexed_user is not None and indexed_user.id == user.id:
+            del self._users[user.name]
+
+    def update(self, before, after):
+        if before.name != after.name:
+            self.remove(before)
+        self.add(after)
+
+    def __len__(self):
+        return len(self._users)
+
+
+discord_user_index = DiscordUserIndex()
+
+
+async def query_discord_user_by_name(client, name):
+    """
+    Ask each guild for members matching the name and index the exact match
+
+    :param client:
+    :param name:
+    :return:
+    """
+
+    for guild in client.guilds:
+        members = await guild.query_members(query=name, limit=QUERY_MEMBERS_LIMIT)
+        for member in members:
+            if member.name == name:
+                discord_user_index.add(member)
+                return member
+    return None
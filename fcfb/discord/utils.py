@@ -1,21 +1,22 @@
 import discord
-import sys
 import logging
 
-from fcfb.api.zebstrika.games import get_ongoing_game_by_thread_id
+from fcfb.api.zebstrika.cache import TTLCache
+from fcfb.discord.scheduler import message_scheduler, PRIORITY_INFO
+from fcfb.discord.tag_index import forum_tag_index
+from fcfb.discord.game_store import game_store
+from fcfb.discord.thread_index import game_thread_index
+from fcfb.discord.user_index import discord_user_index, query_discord_user_by_name
 from fcfb.main.exceptions import async_exception_handler, DiscordAPIError
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
+MAX_MESSAGE_LENGTH = 2000
+FETCHED_THREAD_CACHE_SIZE = 1024
+FETCHED_THREAD_CACHE_TTL = 3600
 
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+logger = logging.getLogger(__name__)
+
+# Threads the gateway does not keep, like archived ones, remembered once they have been fetched
+fetched_threads = TTLCache(FETCHED_THREAD_CACHE_SIZE, FETCHED_THREAD_CACHE_TTL)
 
 
 @async_exception_handler()
@@ -29,12 +30,14 @@ async def get_discord_user_by_name(client, name):
     """
 
     try:
-        user = discord.utils.get(client.users, name=name)
+        user = discord_user_index.get(name)
+        if user is None:
+            user = await query_discord_user_by_name(client, name)
         if user is None:
             raise DiscordAPIError("User not found")
         return user
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue getting the Discord user object, {e}")
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue getting the Discord user object, {e}") from e
 
 
 @async_exception_handler()
@@ -67,12 +70,10 @@ async def create_game_thread(client, channel_id, home_team, away_team, season, s
             name=thread_name,
             content="",
             applied_tags=tags_to_apply)
-        logger.info("Thread named " + thread_name + " created")
+        logger.info("Thread named %s created", thread_name)
         return game_thread
-    except DiscordAPIError as dae:
-        raise dae
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue creating the thread, {e}")
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue creating the thread, {e}") from e
 
 
 @async_exception_handler()
@@ -88,50 +89,37 @@ async def verify_tags_exist(channel, tags):
     """
 
     try:
-        # Get the current tag list
-        available_tags = channel.available_tags
-        available_tag_names = []
-        for tag in available_tags:
-            available_tag_names.append(tag.name)
-
-        # Create any tags that do not exist
-        for tag in tags:
-            if tag not in available_tag_names:
-                await create_tag(channel, tag)
-
-        # Get the update tag list
-        available_tags = channel.available_tags
-        available_tag_names = []
-        for tag in available_tags:
-            available_tag_names.append(tag.name)
-
-        # Create the list of tags to apply to the thread
-        tags_to_apply = []
-        for tag in available_tags:
-            if tag.name in tags:
-                tags_to_apply.append(tag)
-        return tags_to_apply
-    except DiscordAPIError as dae:
-        raise dae
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue verifying the tags exist, {e}")
+        tags = [tag for tag in tags if tag]
+        if forum_tag_index.missing(channel, tags):
+            async with forum_tag_index.creation_lock(channel.id):
+                # Another game starting at the same time may have created them while this one waited
+                missing_tags = forum_tag_index.missing(channel, tags)
+                if missing_tags:
+                    await create_tags(channel, missing_tags)
+
+        return forum_tag_index.resolve(channel, tags)
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue verifying the tags exist, {e}") from e
 
 
 @async_exception_handler()
-async def create_tag(channel, tag):
+async def create_tags(channel, tags):
     """
-    Create a tag
+    Create tags in a forum with a single edit of its tag list
 
     :param channel:
-    :param tag:
+    :param tags:
     :return:
     """
 
     try:
-        await channel.create_tag(name=tag)
-        logger.info(f"Tag named {tag} created")
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue creating the tag, {e}")
+        available_tags = list(forum_tag_index.get_tags(channel).values())
+        available_tags.extend(discord.ForumTag(name=tag) for tag in tags)
+        edited_channel = await channel.edit(available_tags=available_tags)
+        forum_tag_index.refresh(edited_channel or channel)
+        logger.info("Tags named %s created", ', '.join(tags))
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue creating the tags, {e}") from e
 
 
 @async_exception_handler()
@@ -145,9 +133,9 @@ async def delete_thread(thread):
 
     try:
         await thread.delete()
-        logger.info("Thread named " + thread.name + " deleted")
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue deleting the thread, {e}")
+        logger.info("Thread named %s deleted", thread.name)
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue deleting the thread, {e}") from e
 
 
 @async_exception_handler()
@@ -160,13 +148,10 @@ async def get_category_by_name(message, category_name):
     :return:
     """
 
-    try:
-        category = discord.utils.get(message.guild.categories, name=category_name)
-        if category is None:
-            raise DiscordAPIError("Category not found")
-        return category
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue getting the category, {e}")
+    category = discord.utils.get(message.guild.categories, name=category_name)
+    if category is None:
+        raise DiscordAPIError("Category not found")
+    return category
 
 
 async def get_channel_by_id(client, channel_id):
@@ -178,13 +163,10 @@ async def get_channel_by_id(client, channel_id):
     :return: Channel object or None if not found
     """
 
-    try:
-        thread = client.get_channel(int(channel_id))
-        if thread is None:
-            raise DiscordAPIError(f"Channel with ID {channel_id} not found")
-        return thread
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue getting the channel by its ID, {e}")
+    thread = client.get_channel(int(channel_id))
+    if thread is None:
+        raise DiscordAPIError(f"Channel with ID {channel_id} not found")
+    return thread
 
 
 @async_exception_handler()
@@ -192,59 +174,101 @@ async def get_thread_by_id(client, thread_id):
     """
     Get a Discord thread by ID
 
+    Active threads come from the client's cache, and only threads it does not hold are fetched from the API
+
     :param client: Discord client object
     :param thread_id: ID of the thread to retrieve
     :return: Channel object or None if not found
     """
 
     try:
-        thread = await client.fetch_channel(int(thread_id))
+        thread_id = int(thread_id)
+        thread = client.get_channel(thread_id) or fetched_threads.get(thread_id)
         if thread is None:
-            raise DiscordAPIError(f"Thread with ID {thread_id} not found")
+            thread = await client.fetch_channel(thread_id)
+            if thread is None:
+                raise DiscordAPIError(f"Thread with ID {thread_id} not found")
+            fetched_threads.set(thread_id, thread)
         return thread
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue getting the thread by its ID, {e}")
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue getting the thread by its ID, {e}") from e
 
 
 @async_exception_handler()
-async def create_message(channel, message_text, embed=None):
+async def create_message(channel, message_text, embed=None, priority=PRIORITY_INFO):
     """
-    Create a message
+    Create a message, queued behind any more urgent sends to the channel
 
     :param channel:
     :param message_text:
     :param embed:
+    :param priority: Send priority class from fcfb.discord.scheduler.
+    :return:
+    """
+
+    try:
+        return await message_scheduler.send(channel.id, lambda: channel.send(message_text, embed=embed), priority)
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue sending a message to the channel, {e}") from e
+
+
+@async_exception_handler()
+async def edit_message(message, embed, priority=PRIORITY_INFO):
+    """
+    Edit the embed of a message, queued behind any more urgent sends to its channel
+
+    :param message: Message or partial message
+    :param embed:
+    :param priority: Send priority class from fcfb.discord.scheduler.
     :return:
     """
 
     try:
-        await channel.send(message_text, embed=embed)
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue sending a message to the channel, {e}")
+        return await message_scheduler.send(message.channel.id, lambda: message.edit(embed=embed), priority)
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue editing the message, {e}") from e
+
 
 @async_exception_handler()
-async def send_direct_message(user, message_text, embed=None):
+async def pin_message(message, priority=PRIORITY_INFO):
     """
-    Send a direct message to a user
+    Pin a message, queued behind any more urgent sends to its channel
+
+    :param message:
+    :param priority: Send priority class from fcfb.discord.scheduler.
+    :return:
+    """
+
+    try:
+        await message_scheduler.send(message.channel.id, message.pin, priority)
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue pinning the message, {e}") from e
+
+
+@async_exception_handler()
+async def send_direct_message(user, message_text, embed=None, priority=PRIORITY_INFO):
+    """
+    Send a direct message to a user, queued behind any more urgent sends to them
 
     :param user: Discord user object
     :param message_text: Text of the message to be sent
     :param embed: Embed object
+    :param priority: Send priority class from fcfb.discord.scheduler
     :return:
     """
 
     try:
         if embed is None:
-            await user.send(message_text)
+            await message_scheduler.send(("user", user.id), lambda: user.send(message_text), priority)
         else:
-            await user.send(message_text, embed=embed)
-        logger.info(f"Direct message sent to {user.name}")
-    except discord.Forbidden:
+            await message_scheduler.send(("user", user.id), lambda: user.send(message_text, embed=embed), priority)
+        logger.info("Direct message sent to %s", user.name)
+    except discord.Forbidden as e:
         # The user has DMs disabled or has blocked the bot
         raise DiscordAPIError(f"Failed to send a direct message to {user.name}. "
-                              f"The user may have DMs disabled or blocked the bot.")
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue sending a direct message, {e}")
+                              f"The user may have DMs disabled or blocked the bot.") from e
+    except discord.DiscordException as e:
+        raise DiscordAPIError(f"There was an issue sending a direct message, {e}") from e
 
 
 @async_exception_handler()
@@ -289,30 +313,37 @@ async def craft_embed(game_object):
 
 
 @async_exception_handler()
-async def check_if_location_is_game_thread(config_data, message):
+async def check_if_location_is_game_thread(context, message):
     """
     Check if the location is a game thread
 
-    :param config_data:
+    :param context:
     :param message:
     :return:
     """
 
-    try:
-        # Cut down on API calls by only looking in channels in the games thread
-        if isinstance(message.channel, discord.Thread):
-            channel_name = message.channel.parent.name
-            if channel_name != "games":
-                return False
-        else:
+    # Cut down on API calls by only looking in channels in the games thread
+    if isinstance(message.channel, discord.Thread):
+        channel_name = message.channel.parent.name
+        if channel_name != "games":
             return False
+    else:
+        return False
 
-        game_object = await get_ongoing_game_by_thread_id(config_data, message.channel.id)
-        if game_object is None:
-            return False
+    # Known threads are answered from the index without an API call
+    thread_id = message.channel.id
+    if game_thread_index.is_game_thread(thread_id):
         return True
-    except Exception as e:
-        raise DiscordAPIError(f"There was an issue checking the location is a game thread, {e}")
+    if game_thread_index.is_non_game_thread(thread_id):
+        return False
+
+    game_object = await context.get_game()
+    if game_object is None:
+        game_thread_index.add_non_game_thread(thread_id)
+        await game_store.forget_thread(thread_id)
+        return False
+    game_thread_index.add_game_thread(thread_id)
+    return True
 
 
 @async_exception_handler()
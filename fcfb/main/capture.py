@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+from fcfb.main.tracing import get_trace_id, append_line
+
+
+class EventRecorder:
+    """
+    Record incoming Discord messages and the Zebstrika responses they led to, as a replay fixture for the benchmarks
+
+    Each record is a JSON line tagged with the trace ID of the message it belongs to. Messages are recorded with
+    their content, so only turn this on where that is acceptable
+    """
+
+    def __init__(self):
+        self.path = None
+        self.api_url = ""
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def configure(self, path, api_url):
+        self.path = path
+        self.api_url = api_url
+
+    async def record_message(self, message, kind):
+        """
+        Record a message as it arrives
+
+        :param message:
+        :param kind: "dm", "thread" or "channel".
+        :return:
+        """
+
+        parent = getattr(message.channel, "parent", None)
+        await self.write({"type": "message", "trace": get_trace_id(), "kind": kind, "channel": message.channel.id,
+                          "parent": parent.name if parent is not None else None,
+                          "author": {"id": message.author.id, "name": message.author.name},
+                          "content": message.content})
+
+    async def record_zebstrika(self, method, endpoint, status_code, text):
+        path = endpoint[len(self.api_url):] if endpoint.startswith(self.api_url) else endpoint
+        await self.write({"type": "zebstrika", "trace": get_trace_id(), "method": method, "path": path,
+                          "status": status_code, "body": text})
+
+    async def write(self, record):
+        line = json.dumps(record, default=str)
+        async with self._write_lock:
+            await asyncio.to_thread(append_line, self.path, line)
+
+
+event_recorder = EventRecorder()
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def gather_or_cancel(*coroutines):
+    """
+    Run independent coroutines together and return their results in order
+
+    If one fails, the others are cancelled and awaited before the error is raised, so nothing is left running
+
+    :param coroutines:
+    :return:
+    """
+
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def gather_all(*coroutines):
+    """
+    Run independent coroutines together and let every one of them finish, even if another fails
+
+    For the steps after a write Zebstrika has already committed, which must each happen whether or not the others do.
+    The first error is raised once they have all finished, and any later ones are logged
+
+    :param coroutines:
+    :return:
+    """
+
+    results = await asyncio.gather(*coroutines, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors[1:]:
+        logger.error("Another step failed alongside %s: %s: %s", errors[0].__class__.__name__,
+                     error.__class__.__name__, error)
+    if errors:
+        raise errors[0]
+    return results
@@ -1,18 +1,11 @@
 import functools
 import logging
-import sys
+from time import perf_counter
 
-# Set up logging
-logging.basicConfig(format='[%(asctime)s] [%(levelname)s] - %(message)s',
-                    level=logging.INFO)
-logger = logging.getLogger("hypnotoad_logger")
+from fcfb.main.metrics import handler_errors, handler_seconds
+from fcfb.main.tracing import start_span, finish_span
 
-# Add Handlers
-stream_handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
-stream_handler.setFormatter(formatter)
-if not logger.hasHandlers():
-    logger.addHandler(stream_handler)
+logger = logging.getLogger(__name__)
 
 
 class DiscordAPIError(Exception):
@@ -27,6 +20,10 @@ class InvalidParameterError(ValueError):
     pass
 
 
+class MessageTemplateError(ValueError):
+    pass
+
+
 class ZebstrikaGamesAPIError(Exception):
     pass
 
@@ -39,33 +36,66 @@ class ZebstrikaUsersAPIError(Exception):
     pass
 
 
+class ZebstrikaClientError(Exception):
+    pass
+
+
+class ZebstrikaUnavailableError(ZebstrikaClientError):
+    pass
+
+
+# Errors from bad input or game rules, already reported back to the user
+EXPECTED_ERRORS = (InvalidParameterError, GameError)
+
+
 def async_exception_handler():
+    """
+    Time each call of the wrapped coroutine for the metrics and the current trace
+
+    Errors pass through with their type and traceback intact, and are logged once where the event is handled, see
+    log_event_error. Timing every call is the price of the per-helper latency metrics and spans, about 0.5 us per
+    call outside a trace and 2 us inside one, see benchmarks/bench_error_handling.py
+
+    :return:
+    """
+
     def decorator(func):
+        module, name = func.__module__, func.__name__
+        span_name = module.rsplit('.', 1)[-1] + "." + name
+        latency = handler_seconds.labels(module, name)
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
+            # Inside a trace the span times the call, otherwise it is timed here for the metrics alone
+            span = start_span(span_name)
+            started_at = perf_counter() if span is None else None
             try:
-                return await func(*args, **kwargs)
-            except DiscordAPIError as dae:
-                error_message = f"Discord API error in {func.__name__}(): {dae}"
-                logger.error(error_message)
-                # Optionally, re-raise the exception if needed
-                raise dae
-            except InvalidParameterError as ipe:
-                error_message = f"Invalid parameter error in {func.__name__}(): {ipe}"
-                logger.error(error_message)
-                # Optionally, re-raise the exception if needed
-                raise ipe
-
-            except GameError as ge:
-                error_message = f"Game error in {func.__name__}(): {ge}"
-                logger.error(error_message)
-                # Optionally, re-raise the exception if needed
-                raise ge
-
-            except Exception as e:
-                error_message = f"An unexpected error occurred in {func.__name__}(): {e}"
-                logger.error(error_message)
-                # Optionally, re-raise the exception if needed
-                raise e
+                result = await func(*args, **kwargs)
+            except BaseException as e:
+                error = e.__class__.__name__
+                handler_errors.inc(module, name, error)
+                latency.observe(perf_counter() - started_at if span is None else finish_span(span, error))
+                raise
+            latency.observe(perf_counter() - started_at if span is None else finish_span(span))
+            return result
         return wrapper
     return decorator
+
+
+def log_event_error(event, error, **context):
+    """
+    Log a failed Discord event once, at the boundary where it was handled
+
+    Errors a user caused are logged as warnings, anything else with its full traceback
+
+    :param event: Name of the event, e.g. on_message.
+    :param error:
+    :param context: Details of the event to log with the error.
+    :return:
+    """
+
+    details = ", ".join(f"{key}={value!r}" for key, value in context.items())
+    if isinstance(error, EXPECTED_ERRORS):
+        logger.warning("%s failed with %s: %s [%s]", event, error.__class__.__name__, error, details)
+    else:
+        logger.error("%s failed with %s: %s [%s]", event, error.__class__.__name__, error, details, exc_info=error)
@@ -1,10 +1,47 @@
 import json
 import pathlib
 import logging
+import string
 import sys
 
 sys.path.append("..")
 
+RESULT_MESSAGE_FIELDS = {"offensive_team", "defensive_team", "yards", "ball_location"}
+
+# Every (result, actual result) Zebstrika can return for each play, after share_play_result folds "TO +x"/"TO -x"
+# into "TO" and the yardage results into "YARDS"
+KICKOFF_RESULT_BRANCHES = {
+    **{yards: ("KICKOFF",) for yards in ("5", "10", "20", "30", "35", "40", "45", "50", "65")},
+    "TOUCHBACK": ("KICKOFF",),
+    "TOUCHDOWN": ("KICKING TEAM TOUCHDOWN",),
+    "FUMBLE": ("MUFFED KICK",),
+    "RETURN TOUCHDOWN": ("RETURN TOUCHDOWN",)
+}
+SCRIMMAGE_RESULT_BRANCHES = {
+    "PICK/FUMBLE 6": ("TURNOVER TOUCHDOWN",),
+    "TO": ("TURNOVER", "TURNOVER TOUCHDOWN"),
+    "YARDS": ("TOUCHDOWN", "SAFETY", "FIRST DOWN", "TURNOVER ON DOWNS", "GAIN", "LOSS")
+}
+POINT_AFTER_RESULT_BRANCHES = {
+    "GOOD": ("GOOD",),
+    "NO GOOD": ("NO GOOD",),
+    "DEFENSE TWO POINT": ("DEFENSE TWO POINT",)
+}
+RESULT_MESSAGE_BRANCHES = {
+    "KICKOFF NORMAL": KICKOFF_RESULT_BRANCHES,
+    "KICKOFF ONSIDE": {"RECOVERED": ("ONSIDE KICK RECOVERED",), "NO GOOD": ("ONSIDE KICK FAILED",)},
+    "KICKOFF SQUIB": {result: actual_results for result, actual_results in KICKOFF_RESULT_BRANCHES.items()
+                      if result not in ("5", "10", "20", "65", "TOUCHBACK")},
+    "RUN": {**SCRIMMAGE_RESULT_BRANCHES, "NO GAIN": ("TURNOVER ON DOWNS", "NO GAIN")},
+    "PASS": {**SCRIMMAGE_RESULT_BRANCHES, "INCOMPLETE": ("TURNOVER ON DOWNS", "NO GAIN")},
+    "SPIKE": {"SPIKE": ("SPIKE",)},
+    "KNEEL": {"KNEEL": ("KNEEL",)},
+    "FIELD GOAL": {"GOOD": ("GOOD",), "NO GOOD": ("NO GOOD",)},
+    "PUNT": {"PUNT": ("PUNT",)},
+    "TWO POINT": POINT_AFTER_RESULT_BRANCHES,
+    "PAT": POINT_AFTER_RESULT_BRANCHES
+}
+
 
 def hypnotoad():
     """
@@ -12,8 +49,95 @@ def hypnotoad():
 
     :return:
     """
+    from fcfb.main.logging_config import configure_logging, stop_logging
     from fcfb.discord.runner import run_hypnotoad
-    run_hypnotoad(config_data, discord_messages)
+
+    configure_logging(config_data)
+    try:
+        discord_messages["resultMessageIndex"] = compile_result_messages(
+            discord_messages, config_data['parameters'].get('strict_messages', True))
+        run_hypnotoad(config_data, discord_messages)
+    finally:
+        stop_logging()
+
+
+def compile_result_messages(discord_messages, strict=True):
+    """
+    Compile the result messages into a flat index keyed by (play, result, actual result)
+
+    Each entry is a tuple of templates, each pre-split into (literal text, field name) pairs. Every play that can be
+    submitted must have messages for every result in RESULT_MESSAGE_BRANCHES, otherwise this fails at startup rather
+    than after Zebstrika has already run the play. Set strict_messages to false in the config to start anyway
+
+    :param discord_messages:
+    :param strict: Raise on any problem, otherwise log the problems and index the valid messages.
+    :return:
+    """
+    from fcfb.discord.game import PLAYS_BY_PLAY_TYPE
+    from fcfb.main.exceptions import MessageTemplateError
+
+    formatter = string.Formatter()
+    result_messages = discord_messages["resultMessage"]
+    index = {}
+    problems = []
+
+    for play_type, plays in PLAYS_BY_PLAY_TYPE.items():
+        for play in plays:
+            play_key = ("kickoff " + play if play_type == "KICKOFF" else play).upper()
+            if play_key not in result_messages:
+                problems.append(f"{play_key} is missing")
+                continue
+            for result, actual_results in RESULT_MESSAGE_BRANCHES.get(play_key, {}).items():
+                for actual_result in actual_results:
+                    if actual_result not in result_messages[play_key].get(result, {}):
+                        problems.append(f"{play_key} > {result} > {actual_result} is missing")
+
+    for play, results in result_messages.items():
+        if not results:
+            problems.append(f"{play} has no results")
+        for result, actual_results in results.items():
+            if not actual_results:
+                problems.append(f"{play} > {result} has no actual results")
+            for actual_result, messages in actual_results.items():
+                if not messages:
+                    problems.append(f"{play} > {result} > {actual_result} has no messages")
+                templates = []
+                for message_number, message in messages.items():
+                    try:
+                        parts = split_template(formatter, message)
+                    except ValueError as e:
+                        problems.append(f"{play} > {result} > {actual_result} > {message_number} is malformed, {e}")
+                        continue
+                    unknown_fields = {field_name for _, field_name in parts if field_name} - RESULT_MESSAGE_FIELDS
+                    if unknown_fields:
+                        problems.append(f"{play} > {result} > {actual_result} > {message_number} uses unknown "
+                                        f"fields {', '.join(sorted(unknown_fields))}")
+                    templates.append(parts)
+                index[(play, result, actual_result)] = tuple(templates)
+
+    if problems:
+        error_message = "Invalid result messages in messages.json: " + "; ".join(problems)
+        if strict:
+            raise MessageTemplateError(error_message)
+        logging.getLogger(__name__).error("%s", error_message)
+    return index
+
+
+def split_template(formatter, message):
+    """
+    Split a message template into (literal text, field name) pairs
+
+    :param formatter:
+    :param message:
+    :return:
+    """
+
+    parts = []
+    for literal, field_name, format_spec, conversion in formatter.parse(message):
+        if format_spec or conversion:
+            raise ValueError(f"format specs and conversions are not supported in {{{field_name}}}")
+        parts.append((literal, field_name))
+    return tuple(parts)
 
 
 if __name__ == '__main__':
@@ -27,4 +151,5 @@ if __name__ == '__main__':
     # Run Hypnotoad
     hypnotoad()
 
-# TODO: Move game ID to footer of embed
\ No newline at end of file
+# TODO: Move game ID to footer of embed
+
@@ -0,0 +1,106 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+from fcfb.main.tracing import get_trace_id
+
+DEFAULT_LOG_FORMAT = '[%(asctime)s] [%(levelname)s] - %(message)s'
+DEFAULT_LOG_LEVEL = "INFO"
+
+_listener = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records as they are, so their messages are formatted on the listener thread instead of the event loop
+
+    Log arguments are read when the listener formats the record, so pass values that will not change afterwards
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class TraceIdFilter(logging.Filter):
+    """
+    Stamp each record with the correlation ID of the trace it was logged under, while still on the logging task
+    """
+
+    def filter(self, record):
+        record.trace_id = get_trace_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "trace_id", None) is not None:
+            entry["traceId"] = record.trace_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(config_data):
+    """
+    Set up logging once for the whole bot from the optional logging section of the config
+
+    Records are put on a queue and written to stdout by a listener thread, so formatting and I/O stay off the event
+    loop. The section can set the root "level", "json" output and per-logger "levels", e.g.
+    {"fcfb.api.zebstrika": "WARNING", "discord": "INFO"}
+
+    :param config_data:
+    :return:
+    """
+
+    global _listener
+
+    logging_config = config_data.get('logging', {})
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if logging_config.get('json', False):
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(logging_config.get('format', DEFAULT_LOG_FORMAT)))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(TraceIdFilter())
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(logging_config.get('level', DEFAULT_LOG_LEVEL))
+    for logger_name, level in logging_config.get('levels', {}).items():
+        logging.getLogger(logger_name).setLevel(level)
+
+    stop_logging()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """
+    Write out every queued record and stop the listener thread
+
+    :return:
+    """
+
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
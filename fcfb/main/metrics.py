@@ -0,0 +1,236 @@
+from bisect import bisect_left
+import logging
+
+from aiohttp import web
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+class Counter:
+    """
+    Monotonic count per label set
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values = {}
+
+    def labels(self, *labels):
+        """
+        Get the counter for one label set, to increment without looking it up on every call
+
+        :param labels:
+        :return:
+        """
+
+        child = self._values.get(labels)
+        if child is None:
+            child = self._values[labels] = CounterChild()
+        return child
+
+    def inc(self, *labels, amount=1):
+        self.labels(*labels).inc(amount)
+
+    def get(self, *labels):
+        child = self._values.get(labels)
+        return child.value if child is not None else 0
+
+    def samples(self):
+        for labels, child in self._values.items():
+            yield self.name, dict(zip(self.label_names, labels)), child.value
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    """
+    Distribution of observed values per label set, in cumulative buckets
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, description, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def labels(self, *labels):
+        """
+        Get the histogram for one label set, to observe into without looking it up on every call
+
+        :param labels:
+        :return:
+        """
+
+        child = self._values.get(labels)
+        if child is None:
+            child = self._values[labels] = HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value, *labels):
+        self.labels(*labels).observe(value)
+
+    def samples(self):
+        for labels, child in self._values.items():
+            label_values = dict(zip(self.label_names, labels))
+            bucket_counts, total, count = child.bucket_counts, child.total, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", {**label_values, "le": format_value(bound)}, cumulative
+            yield self.name + "_sum", label_values, total
+            yield self.name + "_count", label_values, count
+
+
+class HistogramChild:
+    __slots__ = ("buckets", "bucket_counts", "total")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    @property
+    def count(self):
+        # Summed when scraped rather than kept up to date on every observation
+        return sum(self.bucket_counts)
+
+    def observe(self, value):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class CollectedMetric:
+    """
+    Values read from the rest of the bot when the metrics are scraped
+    """
+
+    def __init__(self, name, description, label_names, collect, kind):
+        self.kind = kind
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._collect = collect
+
+    def samples(self):
+        for labels, value in self._collect():
+            yield self.name, dict(zip(self.label_names, labels)), value
+
+
+class MetricsRegistry:
+    """
+    Every metric the bot exports, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, description, label_names=()):
+        return self.register(Counter(name, description, label_names))
+
+    def histogram(self, name, description, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, description, label_names, buckets))
+
+    def collected(self, name, description, label_names, collect, kind="gauge"):
+        """
+        Register a metric whose values are read at scrape time, like the counts kept by the caches
+
+        :param name:
+        :param description:
+        :param label_names:
+        :param collect: Function returning (label values, value) pairs.
+        :param kind: Prometheus type of the metric, gauge or counter.
+        :return:
+        """
+
+        return self.register(CollectedMetric(name, description, label_names, collect, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {format_value(value)}")
+                else:
+                    lines.append(f"{name} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = MetricsRegistry()
+
+zebstrika_requests = metrics.counter(
+    "hypnotoad_zebstrika_requests_total", "Zebstrika requests by route and response status",
+    ("route", "method", "status"))
+zebstrika_request_seconds = metrics.histogram(
+    "hypnotoad_zebstrika_request_seconds", "Zebstrika request latency by route, including retries", ("route",))
+handler_errors = metrics.counter(
+    "hypnotoad_handler_errors_total", "Failed calls of the bot's Discord helpers, commands and API wrappers",
+    ("module", "function", "error"))
+handler_seconds = metrics.histogram(
+    "hypnotoad_handler_seconds", "Latency of every call of the bot's Discord helpers, commands and API wrappers",
+    ("module", "function"))
+
+
+async def start_metrics_server(config_data):
+    """
+    Serve the metrics on the bot's event loop, if parameters.metrics_port is set
+
+    :param config_data:
+    :return: The server's runner, or None if the metrics server is turned off
+    """
+
+    port = config_data['parameters'].get('metrics_port')
+    if port is None:
+        return None
+
+    async def handle_metrics(request):
+        return web.Response(body=metrics.render().encode(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    host = config_data['parameters'].get('metrics_host', DEFAULT_METRICS_HOST)
+    await web.TCPSite(runner, host, port).start()
+    logger.info("SUCCESS: Serving metrics on http://%s:%s/metrics", host, port)
+    return runner
+
+
+async def stop_metrics_server(runner):
+    if runner is not None:
+        await runner.cleanup()
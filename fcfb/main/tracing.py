@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import json
+import time
+import uuid
+from time import perf_counter
+
+DEFAULT_SLOW_TRACE_COUNT = 50
+
+# Innermost open span of the trace the running task belongs to
+_current_span = contextvars.ContextVar("hypnotoad_current_span", default=None)
+
+
+class Span:
+    """
+    Timed step within a trace
+    """
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "started_at", "duration", "error", "token")
+
+    def __init__(self, trace, span_id, parent_id, name, started_at=None):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.started_at = perf_counter() if started_at is None else started_at
+        self.duration = None
+        self.error = None
+        self.token = None
+
+    def finish(self, error=None):
+        self.duration = perf_counter() - self.started_at
+        self.error = error
+        return self.duration
+
+    def to_dict(self):
+        return {"id": self.span_id, "parent": self.parent_id, "name": self.name,
+                "start": round((self.started_at - self.trace.root.started_at) * 1000, 3),
+                "ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+                "error": self.error}
+
+
+class Trace:
+    """
+    Every span recorded while handling one Discord event, under a correlation ID
+    """
+
+    def __init__(self, name, attributes):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attributes = attributes
+        self.timestamp = time.time()
+        self.root = Span(self, 0, None, name)
+        self.spans = [self.root]
+        self._span_ids = itertools.count(1)
+
+    @property
+    def finished(self):
+        return self.root.duration is not None
+
+    @property
+    def duration(self):
+        return self.root.duration
+
+    def add_span(self, name, parent_id, started_at=None):
+        span = Span(self, next(self._span_ids), parent_id, name, started_at)
+        self.spans.append(span)
+        return span
+
+    def to_dict(self):
+        return {"traceId": self.trace_id, "name": self.root.name, "timestamp": self.timestamp,
+                "ms": round(self.duration * 1000, 3), "attributes": self.attributes,
+                "spans": [span.to_dict() for span in self.spans[1:]]}
+
+
+class Tracer:
+    """
+    Keeps the slowest finished traces and exports every trace to a JSON-lines file
+    """
+
+    def __init__(self, slow_trace_count=DEFAULT_SLOW_TRACE_COUNT):
+        self.path = None
+        self.slow_trace_count = slow_trace_count
+        self._slowest = []
+        self._sequence = itertools.count()
+        self._write_lock = asyncio.Lock()
+
+    def configure(self, path, slow_trace_count):
+        self.path = path
+        self.slow_trace_count = slow_trace_count
+        self._slowest = []
+
+    @contextlib.asynccontextmanager
+    async def trace(self, name, **attributes):
+        """
+        Open a trace that every span started by this task, and the tasks it spawns, is recorded under
+
+        :param name:
+        :param attributes: Details of the event, exported with the trace.
+        :return:
+        """
+
+        trace = Trace(name, attributes)
+        token = _current_span.set(trace.root)
+        error = None
+        try:
+            yield trace
+        except BaseException as e:
+            error = e.__class__.__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            trace.root.finish(error)
+            await self.record(trace)
+
+    async def record(self, trace):
+        heapq.heappush(self._slowest, (trace.duration, next(self._sequence), trace))
+        if len(self._slowest) > self.slow_trace_count:
+            heapq.heappop(self._slowest)
+
+        if self.path is not None:
+            line = json.dumps(trace.to_dict(), default=str)
+            async with self._write_lock:
+                await asyncio.to_thread(append_line, self.path, line)
+
+    def slowest(self, count):
+        return [trace for _, _, trace in heapq.nlargest(count, self._slowest)]
+
+
+def append_line(path, line):
+    with open(path, 'a') as trace_file:
+        trace_file.write(line + "\n")
+
+
+def start_span(name):
+    """
+    Open a child of the current span, or return None when no trace is open
+
+    :param name:
+    :return:
+    """
+
+    parent = _current_span.get()
+    if parent is None or parent.trace.root.duration is not None:
+        return None
+    span = parent.trace.add_span(name, parent.span_id)
+    span.token = _current_span.set(span)
+    return span
+
+
+def finish_span(span, error=None):
+    """
+    Close a span opened by start_span
+
+    :param span:
+    :param error: Class name of the error the span ended with.
+    :return: The span's duration in seconds.
+    """
+
+    _current_span.reset(span.token)
+    return span.finish(error)
+
+
+def bind_to_current_span(job):
+    """
+    Tie a job that another task will run to the current span, with a span for the time it waits to start
+
+    :param job: Coroutine function to run.
+    :return:
+    """
+
+    parent = _current_span.get()
+    if parent is None:
+        return job
+    queued_at = time.perf_counter()
+
+    async def traced_job():
+        parent.trace.add_span("queued", parent.span_id, queued_at).finish()
+        token = _current_span.set(parent)
+        try:
+            return await job()
+        finally:
+            _current_span.reset(token)
+
+    return traced_job
+
+
+def get_trace_id():
+    span = _current_span.get()
+    return span.trace.trace_id if span is not None else None
+
+
+def format_trace(trace, span_count=3):
+    """
+    Summarize a trace in a few lines, with its slowest spans
+
+    :param trace:
+    :param span_count: Number of spans to list.
+    :return:
+    """
+
+    details = ", ".join(f"{key} {value}" for key, value in trace.attributes.items())
+    lines = [f"**{trace.trace_id}** {trace.root.name} {trace.duration * 1000:.0f} ms ({details})"]
+    slowest_spans = heapq.nlargest(span_count, trace.spans[1:], key=lambda span: span.duration or 0)
+    for span in slowest_spans:
+        error = f", {span.error}" if span.error else ""
+        lines.append(f"- {span.name} {(span.duration or 0) * 1000:.0f} ms{error}")
+    return "\n".join(lines)
+
+
+tracer = Tracer()